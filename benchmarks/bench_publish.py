@@ -0,0 +1,113 @@
+import argparse
+import contextlib
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from mkdocs.commands.build import build
+from mkdocs.config import load_config
+
+from mock_confluence import MockConfluence
+from sitegen import generate_site
+
+ENABLE_ENV = "MKDOCS_WITH_CONFLUENCE_BENCHMARK"
+
+
+def peak_rss_kib():
+    # ru_maxrss is in KiB on Linux and in bytes on macOS; rendering workers are counted as children
+    usage = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def run_build(config_file, verbose=False):
+    config = load_config(config_file)
+    config.plugins.on_startup(command="build", dirty=False)
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    start = time.perf_counter()
+    with output:
+        build(config)
+    config.plugins.on_shutdown()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish a synthetic MkDocs site to an in-process mock Confluence")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--depth", type=int, default=3, help="nav sections nested under each other")
+    parser.add_argument("--images", type=int, default=2, help="images per page")
+    parser.add_argument("--unique-images", type=int, default=20, help="size of the image pool pages draw from")
+    parser.add_argument("--page-size", type=int, default=4096, help="approximate markdown characters per page")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every mock response")
+    parser.add_argument("--throttle", type=int, default=0, help="429 responses injected at the start of each run")
+    parser.add_argument("--runs", type=int, default=2, help="builds against the same mock, the first one creates")
+    parser.add_argument("--config", default="{}", help="extra plugin options as JSON")
+    parser.add_argument("--json", dest="json_file", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the plugin output")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("mkdocs").setLevel(logging.ERROR)
+    os.environ[ENABLE_ENV] = "1"
+    results = []
+    with tempfile.TemporaryDirectory() as directory, MockConfluence(latency=args.latency) as mock:
+        mock.add_page("Benchmark Root")
+        plugin_config = {
+            "host_url": mock.url,
+            "space": "BENCH",
+            "parent_page_name": "Benchmark Root",
+            "username": "benchmark",
+            "password": "benchmark",
+            "enabled_if_env": ENABLE_ENV,
+        }
+        plugin_config.update(json.loads(args.config))
+        config_file = generate_site(
+            directory,
+            pages=args.pages,
+            depth=args.depth,
+            images_per_page=args.images,
+            page_size=args.page_size,
+            unique_images=args.unique_images,
+            plugin_config=plugin_config,
+        )
+        for run in range(args.runs):
+            mock.reset_counters()
+            mock.throttle = args.throttle
+            wall_time = run_build(config_file, verbose=args.verbose)
+            results.append(
+                {
+                    "run": run,
+                    "wall_time": round(wall_time, 3),
+                    "requests": sum(mock.requests.values()),
+                    "requests_by_endpoint": dict(sorted(mock.requests.items())),
+                    "throttled": mock.throttled,
+                    "not_modified": mock.not_modified,
+                    "bytes_sent": mock.bytes_received,
+                    "bytes_received": mock.bytes_sent,
+                    "peak_rss_kib": peak_rss_kib(),
+                }
+            )
+            report(results[-1])
+
+    if args.json_file:
+        with open(args.json_file, "w", encoding="utf-8") as f:
+            json.dump({"arguments": vars(args), "runs": results}, f, indent=2)
+
+
+def report(result):
+    print(
+        f"run {result['run']}: {result['wall_time']:.3f}s, {result['requests']} requests "
+        f"({result['throttled']} throttled, {result['not_modified']} not modified), "
+        f"sent {result['bytes_sent'] / 1024:.1f} KiB, received {result['bytes_received'] / 1024:.1f} KiB, "
+        f"peak RSS {result['peak_rss_kib'] / 1024:.1f} MiB"
+    )
+    for endpoint, count in result["requests_by_endpoint"].items():
+        print(f"    {count:>6}  {endpoint}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import re
+import sys
+import timeit
+
+from mkdocs_with_confluence.rewriter import rewrite_images
+
+
+def old_rewrite(markdown):
+    # The on_page_markdown extraction and rewriting before the single-pass rewriter. It does less work: file://
+    # images are only rewritten from /tmp with one exact style, and relative paths are not resolved
+    attachments = []
+    for match in re.finditer(r'img src="file://(.*)" s', markdown):
+        attachments.append(match.group(1))
+    for match in re.finditer(r"!\[[\w\. -]*\]\((?!http|file)([^\s,]*).*\)", markdown):
+        file_path = match.group(1).lstrip("./\\")
+        attachments.append(file_path)
+        attachments.append("docs/" + file_path.replace("../", ""))
+    attachments = list(dict.fromkeys(attachments))
+    new_markdown = re.sub(
+        r'<img src="file:///tmp/', '<p><ac:image ac:height="350"><ri:attachment ri:filename="', markdown
+    )
+    new_markdown = re.sub(r'" style="page-break-inside: avoid;">', '"/></ac:image></p>', new_markdown)
+    return new_markdown, attachments
+
+
+def make_page(images):
+    lines = ["# Large page", ""]
+    for i in range(images):
+        lines.append(f"Paragraph {i} with some text, a [link](other.md#section-{i}) and `code`.")
+        if i % 3 == 0:
+            lines.append(f'<img src="file:///tmp/diagram-{i}.png" style="page-break-inside: avoid;">')
+        elif i % 3 == 1:
+            lines.append(f'![Figure {i}](../img/figure-{i % 50}.png) and ![inline](img/icon.png "Icon")')
+        else:
+            lines.append(f"![Remote {i}](https://example.com/{i}.png)")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(sizes=(100, 1000, 10000), number=20):
+    # Nothing is memoized across calls, every call starts cold like a page of a real build
+    for images in sizes:
+        page = make_page(images)
+        old = min(timeit.repeat(lambda: old_rewrite(page), number=number, repeat=3)) / number
+        new = min(timeit.repeat(lambda: rewrite_images(page, "guide"), number=number, repeat=3)) / number
+        print(
+            f"{images:>6} images, {len(page) / 1024:8.1f} KiB: "
+            f"old {old * 1000:8.2f} ms  new {new * 1000:8.2f} ms  ({old / new:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(number=int(sys.argv[1]) if len(sys.argv) > 1 else 20)
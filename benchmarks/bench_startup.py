@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from sitegen import generate_site
+
+DISABLED_ENV = "MKDOCS_WITH_CONFLUENCE_BENCHMARK_UNSET"
+
+
+def time_build(config_file):
+    # A fresh interpreter per build, so the import time of the plugin is part of the measure
+    env = dict(os.environ)
+    env.pop(DISABLED_ENV, None)
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "mkdocs", "build", "--quiet", "--config-file", config_file],
+        check=True,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time `mkdocs build` without the plugin and with it disabled")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=10, help="builds of each site, interleaved")
+    parser.add_argument("--json", dest="json_file", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    plugin_config = {
+        "host_url": "http://127.0.0.1:9/rest/api/content",
+        "space": "BENCH",
+        "parent_page_name": "Benchmark Root",
+        "username": "benchmark",
+        "password": "benchmark",
+        "enabled_if_env": DISABLED_ENV,
+    }
+    timings = {"without plugin": [], "plugin disabled": []}
+    with tempfile.TemporaryDirectory() as directory:
+        config_files = {
+            "without plugin": generate_site(os.path.join(directory, "bare"), pages=args.pages),
+            "plugin disabled": generate_site(
+                os.path.join(directory, "disabled"), pages=args.pages, plugin_config=plugin_config
+            ),
+        }
+        for name, config_file in config_files.items():
+            # Warm up the file system cache and the bytecode of both sites
+            time_build(config_file)
+        for run in range(args.runs):
+            for name, config_file in config_files.items():
+                timings[name].append(time_build(config_file))
+
+    results = {
+        name: {"median": round(statistics.median(values), 4), "min": round(min(values), 4)}
+        for name, values in timings.items()
+    }
+    for name, result in results.items():
+        print(f"{name:>16}: median {result['median']:.3f}s, min {result['min']:.3f}s")
+    overhead = results["plugin disabled"]["median"] - results["without plugin"]["median"]
+    print(f"{'overhead':>16}: {overhead * 1000:+.1f} ms")
+
+    if args.json_file:
+        with open(args.json_file, "w", encoding="utf-8") as f:
+            json.dump({"arguments": vars(args), "results": results, "overhead": overhead}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+import collections
+import hashlib
+import json
+import re
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CONTENT_PATH_REGEX = re.compile(r"^/rest/api/content(?:/(\d+))?(/child/attachment)?(?:/(\d+)/data)?$")
+
+
+class MockConfluence:
+    # In-memory /rest/api/content, just enough of it for the plugin, with request accounting,
+    # a fixed per-request latency and an optional number of 429 responses to inject.
+    # GET responses carry an ETag and are answered 304 when If-None-Match still matches.
+    # `failures` maps (method, page title or attachment file name) to the error status of those writes.
+    def __init__(self, latency=0.0, throttle=0, retry_after="0", etags=True):
+        self.latency = latency
+        self.etags = etags
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.attachments = {}
+        self.next_id = 1000
+        self.failures = {}
+        self.server = None
+        self.reset_counters()
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = collections.Counter()
+            self.bytes_received = 0
+            self.bytes_sent = 0
+            self.throttled = 0
+            self.not_modified = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_port}/rest/api/content"
+
+    def start(self):
+        handler = type("Handler", (RequestHandler,), {"mock": self})
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def add_page(self, title, parent_id=None, body="", message=""):
+        with self.lock:
+            self.next_id += 1
+            page_id = str(self.next_id)
+            self.pages[page_id] = {
+                "id": page_id,
+                "title": title,
+                "version": 1,
+                "message": message,
+                "parent": parent_id,
+                "body": body,
+            }
+        return page_id
+
+    def endpoint(self, method, path, query):
+        # Request counts are grouped by endpoint, with ids replaced by a placeholder
+        key = method + " " + re.sub(r"/\d+", "/{id}", path)
+        if "title" in query:
+            key += "?title"
+        elif "spaceKey" in query:
+            key += "?spaceKey"
+        return key
+
+    def page_json(self, page, expand=""):
+        result = {
+            "id": page["id"],
+            "type": "page",
+            "title": page["title"],
+            "version": {"number": page["version"], "message": page["message"]},
+        }
+        if "ancestors" in expand:
+            result["ancestors"] = [{"id": a, "title": self.pages[a]["title"]} for a in self.ancestors(page)]
+        if "children.attachment" in expand:
+            attachments = list(self.attachments.get(page["id"], {}).values())
+            result["children"] = {"attachment": {"results": attachments, "size": len(attachments)}}
+        return result
+
+    def ancestors(self, page):
+        ancestors = []
+        parent = page["parent"]
+        while parent:
+            ancestors.insert(0, parent)
+            parent = self.pages[parent]["parent"]
+        return ancestors
+
+    def handle(self, method, path, query, headers, body):
+        match = CONTENT_PATH_REGEX.match(path)
+        if not match:
+            return 404, {"message": "not found"}
+        page_id, attachment_path, attachment_id = match.groups()
+        with self.lock:
+            if page_id is not None and page_id not in self.pages:
+                return 404, {"message": "page not found"}
+            if attachment_path:
+                if method == "GET":
+                    return self.list_attachments(page_id, query)
+                if method == "POST":
+                    return self.upload_attachments(page_id, attachment_id, headers, body)
+            elif page_id is None:
+                if method == "GET":
+                    return self.list_pages(query)
+                if method == "POST":
+                    return self.create_page(json.loads(body))
+            else:
+                if method == "GET":
+                    return 200, self.page_json(self.pages[page_id], query.get("expand", ""))
+                if method == "PUT":
+                    return self.update_page(page_id, json.loads(body))
+        return 405, {"message": "method not allowed"}
+
+    def paginate(self, results, query, path):
+        start, limit = int(query.get("start", 0)), int(query.get("limit", 25))
+        page = results[start : start + limit]
+        links = {}
+        if start + limit < len(results):
+            params = dict(query, start=start + limit, limit=limit)
+            links["next"] = path + "?" + "&".join(f"{key}={value}" for key, value in params.items())
+        return 200, {"results": page, "start": start, "limit": limit, "size": len(page), "_links": links}
+
+    def list_pages(self, query):
+        expand = query.get("expand", "")
+        pages = [page for page in self.pages.values() if query.get("title") in (None, page["title"])]
+        return self.paginate([self.page_json(page, expand) for page in pages], query, "/rest/api/content")
+
+    def failure(self, method, name):
+        status = self.failures.get((method, name))
+        return (status, {"message": f"injected failure for {name}"}) if status else None
+
+    def create_page(self, data):
+        failure = self.failure("POST", data["title"])
+        if failure:
+            return failure
+        if any(page["title"] == data["title"] for page in self.pages.values()):
+            return 400, {"message": "A page with this title already exists"}
+        ancestors = data.get("ancestors") or [{}]
+        parent_id = ancestors[0].get("id")
+        if parent_id is not None and str(parent_id) not in self.pages:
+            return 400, {"message": "Parent page not found"}
+        self.next_id += 1
+        page_id = str(self.next_id)
+        self.pages[page_id] = {
+            "id": page_id,
+            "title": data["title"],
+            "version": 1,
+            "message": data.get("version", {}).get("message", ""),
+            "parent": str(parent_id) if parent_id is not None else None,
+            "body": data["body"]["storage"]["value"],
+        }
+        return 200, self.page_json(self.pages[page_id], "ancestors")
+
+    def update_page(self, page_id, data):
+        page = self.pages[page_id]
+        failure = self.failure("PUT", data["title"])
+        if failure:
+            return failure
+        if data["version"]["number"] != page["version"] + 1:
+            return 409, {"message": "Version must be incremented on update"}
+        page["version"] += 1
+        page["message"] = data["version"].get("message", "")
+        page["body"] = data["body"]["storage"]["value"]
+        if data.get("ancestors"):
+            page["parent"] = str(data["ancestors"][0]["id"])
+        return 200, self.page_json(page, "ancestors")
+
+    def list_attachments(self, page_id, query):
+        attachments = list(self.attachments.get(page_id, {}).values())
+        if "filename" in query:
+            attachments = [a for a in attachments if a["title"] == query["filename"]]
+        return self.paginate(attachments, query, f"/rest/api/content/{page_id}/child/attachment")
+
+    def upload_attachments(self, page_id, attachment_id, headers, body):
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + headers["Content-Type"].encode("latin-1") + b"\r\n\r\n" + body
+        )
+        files, comments = [], []
+        for part in message.iter_parts():
+            if part.get_param("name", header="content-disposition") == "comment":
+                comments.append(part.get_payload(decode=True).decode("utf-8"))
+            elif part.get_filename():
+                files.append((part.get_filename(), len(part.get_payload(decode=True))))
+        for filename, size in files:
+            failure = self.failure("POST", filename)
+            if failure:
+                return failure
+        attachments = self.attachments.setdefault(page_id, {})
+        results = []
+        for i, (filename, size) in enumerate(files):
+            comment = comments[i] if i < len(comments) else ""
+            if attachment_id is not None:
+                attachment = next((a for a in attachments.values() if a["id"] == attachment_id), None)
+                if attachment is None:
+                    return 404, {"message": "attachment not found"}
+                attachment["version"] = {"number": attachment["version"]["number"] + 1, "message": comment}
+            else:
+                if filename in attachments:
+                    return 400, {"message": "Cannot add a new attachment with same file name as an existing one"}
+                self.next_id += 1
+                attachment = {"id": str(self.next_id), "title": filename, "version": {"number": 1, "message": comment}}
+                attachments[filename] = attachment
+            attachment["extensions"] = {"fileSize": size}
+            results.append(attachment)
+        if attachment_id is not None:
+            return 200, results[0]
+        return 200, {"results": results, "size": len(results)}
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, method):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        mock = self.mock
+        with mock.lock:
+            mock.requests[mock.endpoint(method, path, query)] += 1
+            mock.bytes_received += len(body)
+            throttled = mock.throttle > 0
+            if throttled:
+                mock.throttle -= 1
+                mock.throttled += 1
+        if mock.latency:
+            time.sleep(mock.latency)
+        if throttled:
+            status, result, headers = 429, {"message": "Rate limit exceeded"}, {"Retry-After": mock.retry_after}
+        else:
+            status, result = mock.handle(method, path, query, self.headers, body)
+            headers = {}
+        data = json.dumps(result).encode("utf-8")
+        if method == "GET" and status == 200 and mock.etags:
+            headers["ETag"] = '"' + hashlib.sha1(data).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == headers["ETag"]:
+                status, data = 304, b""
+                with mock.lock:
+                    mock.not_modified += 1
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        with mock.lock:
+            mock.bytes_sent += len(data)
+
+    def do_GET(self):
+        self.respond("GET")
+
+    def do_POST(self):
+        self.respond("POST")
+
+    def do_PUT(self):
+        self.respond("PUT")
@@ -0,0 +1,108 @@
+import os
+import random
+import zlib
+
+import yaml
+
+WORDS = (
+    "confluence page export markdown plugin section build publish attachment image table list render "
+    "storage format space parent child version update create request latency cache index nav"
+).split()
+
+
+def png(width, height, seed):
+    # A small valid PNG of random grey noise, so every image has a distinct content hash
+    rng = random.Random(seed)
+    rows = b"".join(b"\x00" + bytes(rng.randrange(256) for _ in range(width)) for _ in range(height))
+
+    def chunk(kind, data):
+        return len(data).to_bytes(4, "big") + kind + data + zlib.crc32(kind + data).to_bytes(4, "big")
+
+    header = width.to_bytes(4, "big") + height.to_bytes(4, "big") + b"\x08\x00\x00\x00\x00"
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+def paragraph(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words).capitalize() + "."
+
+
+def page_markdown(rng, title, depth, images, page_size, image_names):
+    lines = [f"# {title}", ""]
+    prefix = "../" * depth
+    sections = max(1, images)
+    for section in range(sections):
+        lines.append(f"## {title} section {section + 1}")
+        lines.append("")
+        lines.append(paragraph(rng, max(80, page_size // sections)))
+        lines.append("")
+        if section < images:
+            name = image_names[rng.randrange(len(image_names))]
+            lines.append(f"![{title} figure {section + 1}]({prefix}img/{name})")
+            lines.append("")
+        if section % 4 == 3:
+            lines.append("| Key | Value |")
+            lines.append("| --- | ----- |")
+            lines.extend(f"| {rng.choice(WORDS)} | {rng.randrange(1000)} |" for _ in range(3))
+            lines.append("")
+    return "\n".join(lines)
+
+
+def generate_site(
+    directory,
+    pages=50,
+    depth=3,
+    images_per_page=2,
+    page_size=4096,
+    unique_images=20,
+    image_size=64,
+    seed=0,
+    plugin_config=None,
+):
+    # Writes docs/ and mkdocs.yml for a site of `pages` pages spread over a nav `depth` sections deep.
+    # Pages draw their images from a shared pool of `unique_images` PNG files.
+    rng = random.Random(seed)
+    docs_dir = os.path.join(directory, "docs")
+    os.makedirs(os.path.join(docs_dir, "img"), exist_ok=True)
+
+    image_names = []
+    for i in range(max(1, unique_images)):
+        name = f"image-{i:04d}.png"
+        with open(os.path.join(docs_dir, "img", name), "wb") as f:
+            f.write(png(image_size, image_size, seed * 100003 + i))
+        image_names.append(name)
+
+    with open(os.path.join(docs_dir, "index.md"), "w", encoding="utf-8") as f:
+        f.write(page_markdown(rng, "Home", 0, images_per_page, page_size, image_names))
+    nav = [{"Home": "index.md"}]
+
+    # Pages are dealt round-robin into sections, each section nested one level under the previous one
+    sections = max(1, depth)
+    section_dirs = ["/".join(f"section-{n + 1}" for n in range(level + 1)) for level in range(sections)]
+    section_pages = [[] for _ in range(sections)]
+    for i in range(max(0, pages - 1)):
+        level = i % sections
+        title = f"Page {i + 1:05d}"
+        src_path = f"{section_dirs[level]}/page-{i + 1:05d}.md"
+        os.makedirs(os.path.join(docs_dir, section_dirs[level]), exist_ok=True)
+        with open(os.path.join(docs_dir, src_path), "w", encoding="utf-8") as f:
+            f.write(page_markdown(rng, title, level + 1, images_per_page, page_size, image_names))
+        section_pages[level].append({title: src_path})
+
+    section_nav = []
+    for level in reversed(range(sections)):
+        section_nav = [{f"Section {level + 1}": section_pages[level] + section_nav}]
+    nav.extend(section_nav)
+
+    config = {"site_name": "Benchmark", "nav": nav}
+    if plugin_config is not None:
+        config["plugins"] = [{"mkdocs-with-confluence": plugin_config}]
+    config_file = os.path.join(directory, "mkdocs.yml")
+    with open(config_file, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return config_file
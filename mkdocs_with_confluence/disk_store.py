@@ -0,0 +1,83 @@
+import os
+import threading
+
+
+class DiskStore:
+    # Text entries on disk by key (a hex digest), evicted least recently used first once over max_bytes
+    def __init__(self, directory, max_bytes, suffix):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.size = None
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None
+        try:
+            # The mtime is the last use
+            os.utime(path)
+        except OSError:
+            pass
+        return text
+
+    def put(self, key, text):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for mtime, size, entry in self.entries())
+            else:
+                self.size += os.path.getsize(path) - replaced
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def delete(self, key):
+        path = self.path(key)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self.lock:
+            if self.size is not None:
+                self.size -= size
+
+    def entries(self):
+        for root, dirs, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.endswith(self.suffix):
+                    entry = os.path.join(root, filename)
+                    try:
+                        stat = os.stat(entry)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, entry
+
+    def evict(self):
+        # Drop the least recently used entries until the store is back to 80% of its budget
+        entries = sorted(self.entries())
+        self.size = sum(size for mtime, size, entry in entries)
+        for mtime, size, entry in entries:
+            if self.size <= self.max_bytes * 0.8:
+                break
+            try:
+                os.remove(entry)
+            except OSError:
+                continue
+            self.size -= size
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mkdocs_with_confluence.jsonfile import read_json, write_json
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+# Adapted from https://stackoverflow.com/a/3431838
+def file_sha1(file_path):
+    hash_sha1 = hashlib.sha1()
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        for n in iter(lambda: f.readinto(buffer), 0):
+            hash_sha1.update(view[:n])
+    return hash_sha1.hexdigest()
+
+
+class HashService:
+    # sha1 of files memoized by (path, size, mtime_ns). Files can be prefetched, they are then hashed in a thread
+    # pool while the build goes on; the memo is optionally kept on disk from one build to the next.
+    def __init__(self, workers=4, cache_file=None, metrics=None):
+        self.workers = max(1, workers)
+        self.cache_file = cache_file
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.memo = {}
+        self.pending = {}
+        self.executor = None
+        self.dirty = False
+        if cache_file:
+            self.load()
+
+    def key(self, path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    def prefetch(self, paths):
+        for path in paths:
+            try:
+                key = self.key(path)
+            except OSError:
+                continue
+            with self.lock:
+                if key not in self.memo and key not in self.pending:
+                    self.submit(key)
+
+    def sha1(self, path):
+        key = self.key(path)
+        with self.lock:
+            file_hash = self.memo.get(key)
+            if file_hash is not None:
+                self.count("hashes.memo_hits")
+                return file_hash
+            future = self.pending.get(key) or self.submit(key)
+        return future.result()
+
+    def submit(self, key):
+        # Called with the lock held
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="mkdocs-with-confluence-hash"
+            )
+        future = self.executor.submit(self.hash, key)
+        self.pending[key] = future
+        return future
+
+    def hash(self, key):
+        try:
+            file_hash = file_sha1(key[0])
+        except BaseException:
+            with self.lock:
+                self.pending.pop(key, None)
+            raise
+        # Memoized before it stops being pending, so a file is never seen as neither and hashed twice
+        with self.lock:
+            self.memo[key] = file_hash
+            self.pending.pop(key, None)
+            self.dirty = True
+        self.count("attachments.bytes_hashed", key[1])
+        return file_hash
+
+    def count(self, name, n=1):
+        if self.metrics is not None:
+            self.metrics.count(name, n)
+
+    def load(self):
+        try:
+            entries = read_json(self.cache_file)
+        except (OSError, ValueError):
+            return
+        for path, (size, mtime_ns, file_hash) in entries.items():
+            self.memo[(path, size, mtime_ns)] = file_hash
+
+    def save(self):
+        # One entry per path, the latest; files that are gone are dropped
+        if not self.cache_file or not self.dirty:
+            return
+        with self.lock:
+            entries = {}
+            for (path, size, mtime_ns), file_hash in self.memo.items():
+                if entries.get(path, (0, -1))[1] < mtime_ns and os.path.exists(path):
+                    entries[path] = (size, mtime_ns, file_hash)
+            self.dirty = False
+        write_json(self.cache_file, entries)
@@ -0,0 +1,153 @@
+import base64
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from mkdocs_with_confluence.disk_store import DiskStore
+
+# The first numeric segment of a path is the content a request reads or writes, what precedes it the collection
+CONTENT_ID_REGEX = re.compile(r"^(.*?)/(\d+)(?:/|$)")
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class HttpCache:
+    # Takes the place of the session under the request scheduler. Identical GETs are sent once per build, and
+    # responses carrying an ETag or Last-Modified are kept on disk, then revalidated by the next build so unchanged
+    # metadata comes back as a 304 without a body. Our own writes drop everything they may have changed.
+    def __init__(self, session, directory, ttl, max_bytes, metrics=None):
+        self.session = session
+        self.store = DiskStore(directory, max_bytes, ".json")
+        self.ttl = ttl
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.memo = {}
+        self.stored = {}
+        self.generation = 0
+
+    def reset(self):
+        # The memo only lives for one build, disk entries are revalidated anyway
+        with self.lock:
+            self.memo = {}
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        if method != "GET":
+            try:
+                return self.session.request(method, url, params=params, headers=headers, **kwargs)
+            finally:
+                self.invalidate(url)
+
+        key = url
+        if params:
+            key += ("&" if "?" in url else "?") + urlencode(sorted(params.items()), doseq=True)
+        with self.lock:
+            r = self.memo.get(key)
+            generation = self.generation
+        if r is not None:
+            self.count("http_cache.hits")
+            r = copy.copy(r)
+            r.from_cache = True
+            return r
+
+        entry = self.load(key)
+        headers = dict(headers or {})
+        if entry is not None:
+            if "ETag" in entry["headers"]:
+                headers["If-None-Match"] = entry["headers"]["ETag"]
+            if "Last-Modified" in entry["headers"]:
+                headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        r = self.session.request(method, url, params=params, headers=headers, **kwargs)
+        if r.status_code == 304 and entry is not None:
+            self.count("http_cache.revalidated")
+            r = self.cached_response(r, entry)
+        elif r.status_code == 200:
+            self.count("http_cache.misses")
+            self.save(key, r)
+        else:
+            return r
+        with self.lock:
+            # A write since the request was sent may have made this response stale
+            if self.generation == generation:
+                self.memo[key] = r
+        return r
+
+    def cached_response(self, r, entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(r.headers)
+        response.headers.update(entry["headers"])
+        response.url = r.url
+        response.encoding = entry["encoding"]
+        response._content = base64.b64decode(entry["content"])
+        response.request = r.request
+        response.revalidated = True
+        return response
+
+    def store_key(self, key):
+        # Entries are stored by a digest of the URL
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def load(self, key):
+        text = self.store.get(self.store_key(key))
+        if text is None:
+            return None
+        try:
+            entry = json.loads(text)
+        except ValueError:
+            entry = None
+        if entry is None or time.time() - entry["stored"] > self.ttl:
+            self.store.delete(self.store_key(key))
+            return None
+        with self.lock:
+            self.stored[key] = urlsplit(key).path
+        return entry
+
+    def save(self, key, r):
+        entry_headers = {name: r.headers[name] for name in STORED_HEADERS if name in r.headers}
+        if "ETag" not in entry_headers and "Last-Modified" not in entry_headers:
+            return
+        entry = {
+            "url": key,
+            "stored": time.time(),
+            "headers": entry_headers,
+            "encoding": r.encoding,
+            "content": base64.b64encode(r.content).decode("ascii"),
+        }
+        self.store.put(self.store_key(key), json.dumps(entry))
+        with self.lock:
+            self.stored[key] = urlsplit(key).path
+
+    def invalidate(self, url):
+        # A write to a page drops the lookups of that page and every query on the collection (title searches, index)
+        match = CONTENT_ID_REGEX.match(urlsplit(url).path)
+        if match:
+            collection, prefix = match.group(1), match.group(1) + "/" + match.group(2)
+        else:
+            collection, prefix = urlsplit(url).path.rstrip("/"), None
+
+        def affected(path):
+            path = path.rstrip("/")
+            return path == collection or (prefix is not None and (path == prefix or path.startswith(prefix + "/")))
+
+        with self.lock:
+            self.generation += 1
+            self.memo = {key: r for key, r in self.memo.items() if not affected(urlsplit(key).path)}
+            dropped = [key for key, path in self.stored.items() if affected(path)]
+            for key in dropped:
+                del self.stored[key]
+        for key in dropped:
+            self.store.delete(self.store_key(key))
+
+    def count(self, name):
+        if self.metrics is not None:
+            self.metrics.count(name)
+
+    def close(self):
+        self.session.close()
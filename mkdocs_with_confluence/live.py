@@ -0,0 +1,55 @@
+import threading
+
+
+class LivePublisher:
+    # Collects the pages changed by `mkdocs serve` rebuilds and publishes them from a background thread once no
+    # rebuild came in for `delay` seconds. Rapid saves end up in one batch, and a batch never overlaps the previous one.
+    # `publish` returns the items that failed, they go out again with the next batch.
+    def __init__(self, publish, delay=2.0):
+        self.publish = publish
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.publishing = threading.Lock()
+        self.pending = {}
+        self.replaced = set()
+        self.timer = None
+
+    def submit(self, items):
+        with self.lock:
+            for item in items:
+                # The latest rebuild of a page replaces the one still waiting
+                self.pending[item["title"]] = item
+                self.replaced.add(item["title"])
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def discard(self, title):
+        # The page was rebuilt as it is published, whatever still waits for it is outdated
+        with self.lock:
+            self.pending.pop(title, None)
+            self.replaced.add(title)
+
+    def flush(self):
+        with self.publishing:
+            with self.lock:
+                batch = list(self.pending.values())
+                self.pending = {}
+                self.replaced = set()
+            if not batch:
+                return
+            failed = self.publish(batch) or []
+            with self.lock:
+                for item in failed:
+                    # Unless a rebuild replaced or discarded the page while the batch was running
+                    if item["title"] not in self.replaced:
+                        self.pending.setdefault(item["title"], item)
+
+    def close(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        self.flush()
@@ -0,0 +1,155 @@
+import contextlib
+import functools
+import json
+import re
+import threading
+import time
+
+# Upper bounds in milliseconds of the latency histogram buckets, the last one catches everything slower
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+ID_REGEX = re.compile(r"/\d+(?=/|$)")
+
+
+class Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        ms = seconds * 1000
+        for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+            if ms <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def summary(self):
+        labels = [f"<={bound}ms" for bound in HISTOGRAM_BOUNDS_MS] + [f">{HISTOGRAM_BOUNDS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 4),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "histogram": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+class Metrics:
+    # Timings of the plugin phases, HTTP requests by endpoint and plain counters (retries, skipped no-ops,
+    # bytes), collected from any thread and summarized once per build
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.start = time.perf_counter()
+            self.timings = {}
+            self.requests = {}
+            self.counters = {}
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_timing(name, time.perf_counter() - start)
+
+    def add_timing(self, name, seconds):
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = self.timings[name] = Timing()
+            timing.add(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_request(self, method, url, status, seconds, sent, received):
+        endpoint = method + " " + ID_REGEX.sub("/{id}", url.split("?", 1)[0].split("/rest/api", 1)[-1])
+        with self.lock:
+            entry = self.requests.get(endpoint)
+            if entry is None:
+                entry = self.requests[endpoint] = {
+                    "timing": Timing(),
+                    "status": {},
+                    "bytes_sent": 0,
+                    "bytes_received": 0,
+                }
+            entry["timing"].add(seconds)
+            entry["status"][str(status)] = entry["status"].get(str(status), 0) + 1
+            entry["bytes_sent"] += sent
+            entry["bytes_received"] += received
+
+    def summary(self):
+        with self.lock:
+            requests = {}
+            for endpoint, entry in sorted(self.requests.items()):
+                requests[endpoint] = dict(
+                    entry["timing"].summary(),
+                    status=entry["status"],
+                    bytes_sent=entry["bytes_sent"],
+                    bytes_received=entry["bytes_received"],
+                )
+            return {
+                "started": self.started,
+                "wall_time_s": round(time.perf_counter() - self.start, 4),
+                "phases": {name: timing.summary() for name, timing in sorted(self.timings.items())},
+                "requests": requests,
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def table(self):
+        summary = self.summary()
+        rows = [("phase / request", "count", "total s", "mean ms", "max ms", "sent KiB", "recv KiB")]
+        for name, timing in summary["phases"].items():
+            rows.append((name, timing["count"], timing["total_s"], timing["mean_ms"], timing["max_ms"], "", ""))
+        for name, entry in summary["requests"].items():
+            rows.append(
+                (
+                    name,
+                    entry["count"],
+                    entry["total_s"],
+                    entry["mean_ms"],
+                    entry["max_ms"],
+                    round(entry["bytes_sent"] / 1024, 1),
+                    round(entry["bytes_received"] / 1024, 1),
+                )
+            )
+        widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+        lines = [
+            "  ".join(
+                str(value).ljust(width) if i == 0 else str(value).rjust(width)
+                for i, (value, width) in enumerate(zip(row, widths))
+            )
+            for row in rows
+        ]
+        counters = ", ".join(f"{name}={value}" for name, value in summary["counters"].items())
+        lines.append(f"wall time {summary['wall_time_s']}s" + (f", {counters}" if counters else ""))
+        return "\n".join(lines)
+
+
+def timed(name):
+    # Records every call of a plugin method under `name` in the plugin's metrics
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
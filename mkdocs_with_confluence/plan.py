@@ -0,0 +1,97 @@
+import os
+import re
+import threading
+import time
+
+from mkdocs_with_confluence.jsonfile import write_json
+
+# The sha1 the plugin stores in the version message of every page and attachment it publishes
+VERSION_HASH_REGEX = re.compile(r"\[v([a-f0-9]{40})]$")
+
+
+def message_hash(message):
+    match = VERSION_HASH_REGEX.search(message or "")
+    return match.group(1) if match else None
+
+
+class PublishPlan:
+    # What a publish would do, diffed locally against one snapshot of the space:
+    # {"pages": {title: {...}}, "space": ..., "taken": ...}, pages carrying their attachments by file name
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.remote = snapshot["pages"]
+        self.pages = {}
+        self.attachments = []
+        self.lock = threading.Lock()
+
+    def plan_section(self, title, parent):
+        with self.lock:
+            if title in self.remote or title in self.pages:
+                return
+            self.pages[title] = {"title": title, "kind": "section", "action": "create", "parent": parent}
+
+    def plan_page(self, title, parent, body, body_hash):
+        remote = self.remote.get(title)
+        entry = {"title": title, "kind": "page", "parent": parent, "bytes": len(body.encode("utf-8"))}
+        if remote is None:
+            entry["action"] = "create"
+        elif remote["parent"] != parent:
+            # Publishing never moves a page, it is left alone when its parent differs
+            entry.update(action="skip", reason=f"parent on Confluence is '{remote['parent']}'", id=remote["id"])
+        elif message_hash(remote["message"]) == body_hash:
+            entry.update(action="noop", id=remote["id"], version=remote["version"])
+        else:
+            entry.update(action="update", id=remote["id"], version=remote["version"])
+        with self.lock:
+            self.pages[title] = entry
+        return entry["action"]
+
+    def plan_attachments(self, title, files):
+        # files: (path, sha1, size) of everything the page would upload
+        page = self.pages.get(title)
+        if page is not None and page["action"] == "skip":
+            return
+        remote = self.remote.get(title)
+        remote_attachments = remote.get("attachments", {}) if remote is not None else {}
+        entries = []
+        for path, file_hash, size in files:
+            filename = os.path.basename(path)
+            existing = remote_attachments.get(filename)
+            if existing is None:
+                action = "create"
+            elif message_hash(existing.get("message")) == file_hash:
+                action = "noop"
+            else:
+                action = "update"
+            entries.append({"page": title, "file": filename, "path": str(path), "action": action, "bytes": size})
+        with self.lock:
+            self.attachments.extend(entries)
+
+    def summary(self):
+        pages, attachments = {}, {}
+        for entry in self.pages.values():
+            pages[entry["action"]] = pages.get(entry["action"], 0) + 1
+        upload_bytes = 0
+        for entry in self.attachments:
+            attachments[entry["action"]] = attachments.get(entry["action"], 0) + 1
+            if entry["action"] != "noop":
+                upload_bytes += entry["bytes"]
+        writes = ("create", "update")
+        page_bytes = sum(entry.get("bytes", 0) for entry in self.pages.values() if entry["action"] in writes)
+        return {
+            "pages": pages,
+            "attachments": attachments,
+            "page_bytes": page_bytes,
+            "attachment_bytes": upload_bytes,
+        }
+
+    def write(self, path):
+        plan = {
+            "created": time.time(),
+            "space": self.snapshot.get("space"),
+            "snapshot_taken": self.snapshot.get("taken"),
+            "summary": self.summary(),
+            "pages": sorted(self.pages.values(), key=lambda entry: (entry["action"], entry["title"])),
+            "attachments": sorted(self.attachments, key=lambda entry: (entry["action"], entry["page"], entry["file"])),
+        }
+        write_json(path, plan)
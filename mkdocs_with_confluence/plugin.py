@@ -1,39 +1,56 @@
-import time
 import os
-import hashlib
-import sys
+import posixpath
 import re
-import tempfile
-import shutil
-import requests
-import mimetypes
-import mistune
-import contextlib
-from time import sleep
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from mkdocs.config import config_options
+from mkdocs.exceptions import PluginError
 from mkdocs.plugins import BasePlugin
-from md2cf.confluence_renderer import ConfluenceRenderer
+from mkdocs_with_confluence.hashes import HashService
+from mkdocs_with_confluence.live import LivePublisher
+from mkdocs_with_confluence.jsonfile import read_json, write_json
+from mkdocs_with_confluence.metrics import Metrics, timed
+from mkdocs_with_confluence.plan import VERSION_HASH_REGEX, PublishPlan
+from mkdocs_with_confluence.progress import ProgressReporter
+from mkdocs_with_confluence.rewriter import rewrite_images
+from mkdocs_with_confluence.render_cache import RenderCache, package_version
+from mkdocs_with_confluence.uploads import ByteBudget, MultipartStream
 from os import environ
 from pathlib import Path
+from urllib.parse import urlsplit
 
 TEMPLATE_BODY = "<p> TEMPLATE </p>"
+DRYRUN_PAGE_ID = "dryrun-"
+
+# Child of the "mkdocs" logger, so messages are formatted and filtered (-v, -q) like the ones of MkDocs
+log = logging.getLogger("mkdocs.plugins.mkdocs_with_confluence")
+
+
+# One renderer per process of the render pool
+render_worker_markdown = None
+
 
+def build_renderer():
+    # requests, mistune and md2cf are only imported by builds that publish, a disabled plugin costs no import time
+    import mistune
+    from md2cf.confluence_renderer import ConfluenceRenderer
 
-@contextlib.contextmanager
-def nostdout():
-    save_stdout = sys.stdout
-    sys.stdout = DummyFile()
-    yield
-    sys.stdout = save_stdout
+    return mistune.Markdown(renderer=ConfluenceRenderer(use_xhtml=True))
 
 
-class DummyFile(object):
-    def write(self, x):
-        pass
+def init_render_worker():
+    global render_worker_markdown
+    render_worker_markdown = build_renderer()
+
+
+def render_in_worker(markdown):
+    return render_worker_markdown(markdown)
 
 
 class MkdocsWithConfluence(BasePlugin):
-    _id = 0
     config_scheme = (
         ("host_url", config_options.Type(str, default=None)),
         ("space", config_options.Type(str, default=None)),
@@ -45,490 +62,1123 @@ class MkdocsWithConfluence(BasePlugin):
         ("verbose", config_options.Type(bool, default=False)),
         ("debug", config_options.Type(bool, default=False)),
         ("dryrun", config_options.Type(bool, default=False)),
+        ("deferred_publish", config_options.Type(bool, default=False)),
+        ("publish_workers", config_options.Type(int, default=4)),
+        ("render_workers", config_options.Type(int, default=0)),
+        ("request_retries", config_options.Type(int, default=5)),
+        ("request_backoff", config_options.Type((int, float), default=0.5)),
+        ("attachment_batch_files", config_options.Type(int, default=10)),
+        ("attachment_batch_bytes", config_options.Type(int, default=10 * 1024 * 1024)),
+        ("max_inflight_bytes", config_options.Type(int, default=64 * 1024 * 1024)),
+        ("artifacts_dir", config_options.Type(str, default=None)),
+        ("render_cache", config_options.Type(bool, default=False)),
+        ("render_cache_dir", config_options.Type(str, default=None)),
+        ("render_cache_max_bytes", config_options.Type(int, default=256 * 1024 * 1024)),
+        ("incremental", config_options.Type(bool, default=False)),
+        ("state_file", config_options.Type(str, default=None)),
+        ("state_verify_interval", config_options.Type(int, default=10)),
+        ("metrics", config_options.Type(bool, default=False)),
+        ("metrics_file", config_options.Type(str, default=None)),
+        ("plan_file", config_options.Type(str, default=None)),
+        ("plan_snapshot", config_options.Type(str, default=None)),
+        ("pool_connections", config_options.Type(int, default=4)),
+        ("pool_maxsize", config_options.Type(int, default=32)),
+        ("connect_timeout", config_options.Type((int, float), default=10)),
+        ("read_timeout", config_options.Type((int, float), default=60)),
+        ("http2", config_options.Type(bool, default=False)),
+        ("hash_workers", config_options.Type(int, default=4)),
+        ("hash_cache_file", config_options.Type(str, default=None)),
+        ("live_publish", config_options.Type(bool, default=True)),
+        ("live_debounce", config_options.Type((int, float), default=2.0)),
+        ("http_cache", config_options.Type(bool, default=False)),
+        ("http_cache_dir", config_options.Type(str, default=None)),
+        ("http_cache_ttl", config_options.Type(int, default=7 * 24 * 3600)),
+        ("http_cache_max_bytes", config_options.Type(int, default=64 * 1024 * 1024)),
+        ("targets", config_options.Type(list, default=[])),
     )
 
     def __init__(self):
         self.enabled = True
-        self.confluence_renderer = ConfluenceRenderer(use_xhtml=True)
-        self.confluence_mistune = mistune.Markdown(renderer=self.confluence_renderer)
+        self.renderer = None
         self.simple_log = False
         self.flen = 1
-        self.session = requests.Session()
+        self.progress = None
+        self.auth = None
+        self.session = None
+        self.request_scheduler = None
+        self.http_cache = None
+        self.http_cache_dir = None
+        self.transport_lock = threading.Lock()
+        self.metrics = Metrics()
+        self.upload_budget = ByteBudget(64 * 1024 * 1024)
         self.page_attachments = {}
+        self.page_index = None
+        self.page_titles = {}
+        self.created_pages = {}
+        self.index_lock = threading.Lock()
+        self.publish_queue = {}
+        self.site_files = None
+        self.state = None
+        self.unchanged_pages = set()
+        self.page_sources = {}
+        self.nav_pages = {}
+        self.nav_labels = {}
+        self.artifact_writer = None
+        self.render_cache = None
+        self.render_salt = None
+        self.deferred = False
+        self.plan = None
+        self.hashes = None
+        self.source_files = {}
+        self.docs_dir = None
+        self.serving = False
+        self.live = None
+        self.live_ready = False
+        self.live_rebuild = False
+        self.live_pages = {}
+        self.live_batch = {}
+        self.live_bodies = {}
+        self.live_assets = {}
+        self.targets = []
+        self.target_name = None
+        self.failed_pages = []
 
     def on_nav(self, nav, config, files):
-        MkdocsWithConfluence.tab_nav = []
-        navigation_items = nav.__repr__()
-
-        for n in navigation_items.split("\n"):
-            leading_spaces = len(n) - len(n.lstrip(" "))
-            spaces = leading_spaces * " "
-            if "Page" in n:
-                try:
-                    self.page_title = self.__get_page_title(n)
-                    if self.page_title is None:
-                        raise AttributeError
-                except AttributeError:
-                    self.page_local_path = self.__get_page_url(n)
-                    print(
-                        f"WARN    - Page from path {self.page_local_path} has no"
-                        f"          entity in the mkdocs.yml nav section. It will be uploaded"
-                        f"          to the Confluence, but you may not see it on the web server!"
+        if not self.enabled:
+            return
+        self.nav_pages = {}
+        self.nav_labels = {}
+        self.__walk_nav(nav.items, [])
+
+    def __walk_nav(self, items, ancestors):
+        spaces = "    " * len(ancestors)
+        for item in items:
+            if item.is_section:
+                self.nav_labels.setdefault(item.title, spaces + item.title)
+                self.__walk_nav(item.children, ancestors + [item.title])
+            elif item.is_page:
+                title = item.title
+                if title is None:
+                    log.warning(
+                        "Page from path %s has no entity in the mkdocs.yml nav section. It will be uploaded "
+                        "to the Confluence, but you may not see it on the web server!",
+                        item.file.src_path,
                     )
-                    self.page_local_name = self.__get_page_name(n)
-                    self.page_title = self.page_local_name
-
-                p = spaces + self.page_title
-                MkdocsWithConfluence.tab_nav.append(p)
-            if "Section" in n:
-                try:
-                    self.section_title = self.__get_section_title(n)
-                    if self.section_title is None:
-                        raise AttributeError
-                except AttributeError:
-                    self.section_local_path = self.__get_page_url(n)
-                    print(
-                        f"WARN    - Section from path {self.section_local_path} has no"
-                        f"          entity in the mkdocs.yml nav section. It will be uploaded"
-                        f"          to the Confluence, but you may not see it on the web server!"
+                    title = os.path.splitext(os.path.basename(item.file.src_path))[0]
+                self.nav_pages[item.file.src_path] = {
+                    "title": title,
+                    "depth": len(ancestors),
+                    "ancestors": ancestors,
+                    "label": spaces + title,
+                }
+                self.nav_labels.setdefault(title, spaces + title)
+
+    def nav_label(self, title):
+        return self.nav_labels.get(title, title)
+
+    @property
+    def confluence_mistune(self):
+        if self.renderer is None:
+            self.renderer = build_renderer()
+        return self.renderer
+
+    @property
+    def scheduler(self):
+        # The transport is created by the first request, builds that never publish do not pay for it
+        with self.transport_lock:
+            if self.request_scheduler is None:
+                from mkdocs_with_confluence.scheduler import RequestScheduler
+                from mkdocs_with_confluence.transport import build_session
+
+                # The pool has room for every publish worker, so none of them waits for a free connection
+                self.session = build_session(
+                    self.auth,
+                    pool_connections=self.config["pool_connections"],
+                    pool_maxsize=max(self.config["pool_maxsize"], self.config["publish_workers"]),
+                    http2=self.config["http2"],
+                )
+                if self.config["http_cache"]:
+                    from mkdocs_with_confluence.http_cache import HttpCache
+
+                    self.http_cache = HttpCache(
+                        self.session,
+                        self.http_cache_dir,
+                        self.config["http_cache_ttl"],
+                        self.config["http_cache_max_bytes"],
+                        self.metrics,
                     )
-                    self.section_local_name = self.__get_section_title(n)
-                    self.section_title = self.section_local_name
-                s = spaces + self.section_title
-                MkdocsWithConfluence.tab_nav.append(s)
+                    self.session = self.http_cache
+                self.request_scheduler = RequestScheduler(
+                    self.session,
+                    max_concurrency=self.config["publish_workers"],
+                    max_retries=self.config["request_retries"],
+                    backoff=self.config["request_backoff"],
+                    metrics=self.metrics,
+                    timeout=(self.config["connect_timeout"], self.config["read_timeout"]),
+                )
+            return self.request_scheduler
+
+    def close_transport(self):
+        with self.transport_lock:
+            if self.session is not None:
+                self.session.close()
+            self.session = None
+            self.request_scheduler = None
+            self.http_cache = None
+
+    def on_startup(self, command, dirty):
+        # Defining on_startup keeps this instance for the whole `mkdocs serve` session
+        self.serving = command == "serve"
+
+    def on_shutdown(self):
+        if self.live is not None:
+            self.live.close()
+            self.live = None
+        self.close_transport()
+        for target in self.targets:
+            target.close_transport()
+
+    def on_pre_build(self, config):
+        if not self.enabled:
+            return
+        self.metrics.reset()
+        if self.http_cache is not None:
+            self.http_cache.reset()
+        # Rebuilds of `mkdocs serve` only publish what changed since the previous one, in the background
+        self.live_rebuild = self.live is not None and self.live_ready
+        self.live_pages = {}
+        self.plan = None
+        self.failed_pages = []
+        self.site_files = None
+        self.unchanged_pages = set()
+        self.page_sources = {}
 
     def on_files(self, files, config):
+        if not self.enabled:
+            return
         pages = files.documentation_pages()
-        try:
-            self.flen = len(pages)
-            print(f"Number of Files in directory tree: {self.flen}")
-        except 0:
-            print("ERR: You have no documentation pages" "in the directory tree, please add at least one!")
-
-    def on_post_template(self, output_content, template_name, config):
-        if self.config["verbose"] is False and self.config["debug"] is False:
-            self.simple_log = True
-            print("INFO    -  Mkdocs With Confluence: Start exporting markdown pages... (simple logging)")
+        self.flen = len(pages)
+        log.debug("Number of Files in directory tree: %d", self.flen)
+        if not self.flen:
+            log.error("You have no documentation pages in the directory tree, please add at least one!")
+
+        if self.simple_log:
+            log.info("Mkdocs With Confluence: Start exporting markdown pages... (simple logging)")
+            self.progress = ProgressReporter(log, "Mkdocs With Confluence: Page export progress", self.flen)
+        # Files copied to the site as they are, by their site path; hashed from their source, which keeps its mtime
+        # (and its memoized hash) from one build to the next
+        self.source_files = {
+            os.path.normpath(file.abs_dest_path): file.abs_src_path
+            for file in files
+            if not file.is_documentation_page() and file.abs_src_path
+        }
+        if self.config["plan_file"]:
+            self.plan = PublishPlan(self.load_snapshot())
+        elif self.live_rebuild:
+            # The index of the first build is kept up to date by our own writes
+            pass
+        elif self.targets:
+            # Every target builds its own index when publishing
+            pass
+        elif self.state is not None and not self.state_verification_due():
+            self.load_page_index()
         else:
-            self.simple_log = False
+            self.build_page_index()
 
     def on_config(self, config):
+        self.simple_log = not self.config["verbose"] and not self.config["debug"]
+        # With `debug` the plugin logs its debug messages even without `mkdocs build --verbose`
+        log.setLevel(logging.DEBUG if self.config["debug"] else logging.NOTSET)
         if "enabled_if_env" in self.config:
             env_name = self.config["enabled_if_env"]
             if env_name:
                 self.enabled = os.environ.get(env_name) == "1"
                 if not self.enabled:
-                    print(
-                        "WARNING - Mkdocs With Confluence: Exporting MKDOCS pages to Confluence turned OFF: "
-                        f"(set environment variable {env_name} to 1 to enable)"
+                    log.warning(
+                        "Mkdocs With Confluence: Exporting MKDOCS pages to Confluence turned OFF: "
+                        "(set environment variable %s to 1 to enable)",
+                        env_name,
                     )
                     return
                 else:
-                    print(
-                        "INFO    -  Mkdocs With Confluence: Exporting MKDOCS pages to Confluence "
-                        f"turned ON by var {env_name}==1!"
+                    log.info(
+                        "Mkdocs With Confluence: Exporting MKDOCS pages to Confluence turned ON by var %s==1!", env_name
                     )
                     self.enabled = True
             else:
-                print(
-                    "WARNING -  Mkdocs With Confluence: Exporting MKDOCS pages to Confluence turned OFF: "
-                    f"(set environment variable {env_name} to 1 to enable)"
+                log.warning(
+                    "Mkdocs With Confluence: Exporting MKDOCS pages to Confluence turned OFF: "
+                    "(set enabled_if_env, then that environment variable to 1 to enable)"
                 )
+                self.enabled = False
                 return
         else:
-            print("INFO    -  Mkdocs With Confluence: Exporting MKDOCS pages to Confluence turned ON by default!")
+            log.info("Mkdocs With Confluence: Exporting MKDOCS pages to Confluence turned ON by default!")
             self.enabled = True
 
+        # Under `mkdocs serve` the transport of the first build stays, a live batch may still be using it
+        if self.live is None:
+            if self.config["api_token"]:
+                self.auth = (self.config["username"], self.config["api_token"])
+            else:
+                self.auth = (self.config["username"], self.config["password"])
+            self.close_transport()
+            self.upload_budget = ByteBudget(self.config["max_inflight_bytes"])
+
+        # Rendering in a process pool needs all pages at once, and so does publishing them to several targets,
+        # both imply deferred publishing
+        self.deferred = (
+            self.config["deferred_publish"] or self.config["render_workers"] > 0 or bool(self.config["targets"])
+        )
+
         if self.config["dryrun"]:
-            print("WARNING -  Mkdocs With Confluence - DRYRUN MODE turned ON")
+            log.warning("Mkdocs With Confluence - DRYRUN MODE turned ON")
             self.dryrun = True
         else:
             self.dryrun = False
 
-    def on_page_markdown(self, markdown, page, config, files):
-        MkdocsWithConfluence._id += 1
-        if self.config["api_token"]:
-            self.session.auth = (self.config["username"], self.config["api_token"])
-        else:
-            self.session.auth = (self.config["username"], self.config["password"])
+        if self.config["plan_file"]:
+            # Plan mode never writes, the pages are diffed against one snapshot of the space
+            log.warning("Mkdocs With Confluence - PLAN MODE turned ON, writing %s", self.config["plan_file"])
+            self.dryrun = True
+            self.deferred = False
+
+        # With targets, each of them keeps its own state
+        if self.config["incremental"] and self.state is None and not self.config["targets"]:
+            state_file = self.config["state_file"]
+            if not state_file:
+                state_file = os.path.join(os.path.dirname(config["config_file_path"]), ".mkdocs-with-confluence.db")
+            from mkdocs_with_confluence.state import SyncState
+
+            self.state = SyncState(state_file)
+
+        self.http_cache_dir = self.config["http_cache_dir"]
+        if not self.http_cache_dir:
+            config_dir = os.path.dirname(config["config_file_path"])
+            self.http_cache_dir = os.path.join(config_dir, ".cache", "mkdocs-with-confluence-http")
+
+        if self.render_salt is None:
+            # What the rendered body depends on besides the markdown
+            packages = ("mkdocs-with-confluence", "md2cf", "mistune")
+            self.render_salt = ";".join(f"{name}={package_version(name)}" for name in packages) + ";xhtml"
+
+        if self.config["render_cache"] and self.render_cache is None:
+            cache_dir = self.config["render_cache_dir"]
+            if not cache_dir:
+                config_dir = os.path.dirname(config["config_file_path"])
+                cache_dir = os.path.join(config_dir, ".cache", "mkdocs-with-confluence")
+            self.render_cache = RenderCache(cache_dir, self.config["render_cache_max_bytes"], self.render_salt)
+
+        if self.hashes is None:
+            self.hashes = HashService(self.config["hash_workers"], self.config["hash_cache_file"], self.metrics)
+        self.docs_dir = config["docs_dir"]
 
+        if self.live is None:
+            self.targets = self.build_targets(config)
+
+        if self.serving and self.config["live_publish"] and not self.config["plan_file"] and self.live is None:
+            log.info("Mkdocs With Confluence: LIVE MODE, rebuilds publish their changed pages in the background")
+            self.live = LivePublisher(self.publish_live_batch, self.config["live_debounce"])
+
+    def on_page_markdown(self, markdown, page, config, files):
         if self.enabled:
-            if self.simple_log is True:
-                print("INFO    - Mkdocs With Confluence: Page export progress: [", end="", flush=True)
-                for i in range(MkdocsWithConfluence._id):
-                    print("#", end="", flush=True)
-                for j in range(self.flen - MkdocsWithConfluence._id):
-                    print("-", end="", flush=True)
-                print(f"] ({MkdocsWithConfluence._id} / {self.flen})", end="\r", flush=True)
-
-            if self.config["debug"]:
-                print(f"\nDEBUG    - Handling Page '{page.title}' (And Parent Nav Pages if necessary):\n")
+            if self.progress is not None:
+                self.progress.advance()
+
+            log.debug("Handling Page '%s' (And Parent Nav Pages if necessary)", page.title)
             if not all(self.config_scheme):
-                print("DEBUG    - ERR: YOU HAVE EMPTY VALUES IN YOUR CONFIG. ABORTING")
+                log.error("Mkdocs With Confluence: YOU HAVE EMPTY VALUES IN YOUR CONFIG. ABORTING")
                 return markdown
 
             try:
-                if self.config["debug"]:
-                    print("DEBUG    - Get section first parent title...: ")
-                try:
-
-                    parent = self.__get_section_title(page.ancestors[0].__repr__())
-                except IndexError as e:
-                    if self.config["debug"]:
-                        print(
-                            f"DEBUG    - WRN({e}): No first parent! Assuming "
-                            f"DEBUG    - {self.config['parent_page_name']}..."
-                        )
-                    parent = None
-                if self.config["debug"]:
-                    print(f"DEBUG    - {parent}")
-                if not parent:
-                    parent = self.config["parent_page_name"]
-
                 if self.config["parent_page_name"] is not None:
                     main_parent = self.config["parent_page_name"]
                 else:
                     main_parent = self.config["space"]
+                # Full ancestor chain from the nav, the root parent first and the direct parent last
+                nav_page = self.nav_pages.get(page.file.src_path)
+                if nav_page is not None:
+                    chain = [main_parent] + nav_page["ancestors"]
+                else:
+                    chain = [main_parent] + [ancestor.title for ancestor in reversed(page.ancestors)]
+                parent = chain[-1]
+
+                log.debug("PARENTS: %s", chain)
+
+                # Finds the page images and rewrites file:// images into Confluence attachments
+                page_dir = posixpath.dirname(page.file.src_path.replace(os.sep, "/"))
+                new_markdown, attachments = rewrite_images(markdown, page_dir)
+                log.debug("FOUND IMAGES: %s", attachments)
+                # Images are hashed in the background while the rest of the site builds
+                self.hashes.prefetch(
+                    attachment if os.path.isabs(attachment) else os.path.join(self.docs_dir, attachment)
+                    for attachment in attachments
+                )
 
-                if self.config["debug"]:
-                    print("DEBUG    - Get section second parent title...: ")
-                try:
-                    parent1 = self.__get_section_title(page.ancestors[1].__repr__())
-                except IndexError as e:
-                    if self.config["debug"]:
-                        print(
-                            f"DEBUG    - ERR({e}) No second parent! Assuming "
-                            f"second parent is main parent: {main_parent}..."
-                        )
-                    parent1 = None
-                if self.config["debug"]:
-                    print(f"{parent}")
-
-                if not parent1:
-                    parent1 = main_parent
-                    if self.config["debug"]:
-                        print(
-                            f"DEBUG    - ONLY ONE PARENT FOUND. ASSUMING AS A "
-                            f"FIRST NODE after main parent config {main_parent}"
-                        )
-
-                if self.config["debug"]:
-                    print(f"DEBUG    - PARENT0: {parent}, PARENT1: {parent1}, MAIN PARENT: {main_parent}")
-
-                tf = tempfile.NamedTemporaryFile(delete=False)
-                f = open(tf.name, "w")
-
-                attachments = []
-                try:
-                    for match in re.finditer(r'img src="file://(.*)" s', markdown):
-                        if self.config["debug"]:
-                            print(f"DEBUG    - FOUND IMAGE: {match.group(1)}")
-                        attachments.append(match.group(1))
-                    for match in re.finditer(r"!\[[\w\. -]*\]\((?!http|file)([^\s,]*).*\)", markdown):
-                        file_path = match.group(1).lstrip("./\\")
-                        attachments.append(file_path)
-
-                        if self.config["debug"]:
-                            print(f"DEBUG    - FOUND IMAGE: {file_path}")
-                        attachments.append("docs/" + file_path.replace("../", ""))
-
-                except AttributeError as e:
-                    if self.config["debug"]:
-                        print(f"DEBUG    - WARN(({e}): No images found in markdown. Proceed..")
-                new_markdown = re.sub(
-                    r'<img src="file:///tmp/', '<p><ac:image ac:height="350"><ri:attachment ri:filename="', markdown
+                if self.plan is not None:
+                    self.plan_page(page.title, self.render_page(new_markdown), chain)
+                    self.page_attachments[page.title] = attachments
+                    return markdown
+
+                source_key = self.get_source_key(markdown, chain, attachments, config)
+                if self.is_page_unchanged(page.title, source_key):
+                    self.metrics.count("pages.unchanged")
+                    self.unchanged_pages.add(page.title)
+                    log.info("Mkdocs With Confluence: %s *NO CHANGE*", self.nav_label(page.title))
+                    return markdown
+
+                if self.live_rebuild:
+                    confluence_body = self.render_page(new_markdown)
+                    body_hash = self.get_body_sha1(confluence_body)
+                    self.live_pages[page.title] = {
+                        "title": page.title,
+                        "markdown": new_markdown,
+                        "body": confluence_body,
+                        "body_hash": body_hash,
+                        "changed": self.live_bodies.get(page.title) != body_hash,
+                        "chain": chain,
+                        "attachments": [],
+                        "source": (page.file.src_path, source_key),
+                    }
+                    self.page_attachments[page.title] = attachments
+                    return markdown
+
+                if self.config["render_workers"] > 0:
+                    # Cache misses are rendered later, all at once, by render_queued_pages
+                    confluence_body = None
+                    if self.render_cache is not None:
+                        confluence_body = self.render_cache.get(new_markdown)
+                        self.metrics.count("render_cache.misses" if confluence_body is None else "render_cache.hits")
+                else:
+                    confluence_body = self.render_page(new_markdown)
+                if confluence_body is not None:
+                    self.after_render(page.title, confluence_body)
+
+                log.debug(
+                    "UPDATING PAGE TO CONFLUENCE, DETAILS: HOST: %s SPACE: %s TITLE: %s PARENT: %s BODY: %s",
+                    self.config["host_url"],
+                    self.config["space"],
+                    page.title,
+                    parent,
+                    confluence_body,
                 )
-                new_markdown = re.sub(r'" style="page-break-inside: avoid;">', '"/></ac:image></p>', new_markdown)
-                confluence_body = self.confluence_mistune(new_markdown)
-                f.write(confluence_body)
-                if self.config["debug"]:
-                    print(confluence_body)
-                page_name = page.title
-                new_name = "confluence_page_" + page_name.replace(" ", "_") + ".html"
-                shutil.copy(f.name, new_name)
-                f.close()
-
-                if self.config["debug"]:
-                    print(
-                        f"\nDEBUG    - UPDATING PAGE TO CONFLUENCE, DETAILS:\n"
-                        f"DEBUG    - HOST: {self.config['host_url']}\n"
-                        f"DEBUG    - SPACE: {self.config['space']}\n"
-                        f"DEBUG    - TITLE: {page.title}\n"
-                        f"DEBUG    - PARENT: {parent}\n"
-                        f"DEBUG    - BODY: {confluence_body}\n"
-                    )
 
-                page_id = self.find_page_id(page.title)
-                if page_id is not None:
-                    if self.config["debug"]:
-                        print(
-                            f"DEBUG    - JUST ONE STEP FROM UPDATE OF PAGE '{page.title}' \n"
-                            f"DEBUG    - CHECKING IF PARENT PAGE ON CONFLUENCE IS THE SAME AS HERE"
-                        )
-
-                    parent_name = self.find_parent_name_of_page(page.title)
-
-                    if parent_name == parent:
-                        if self.config["debug"]:
-                            print("DEBUG    - Parents match. Continue...")
-                    else:
-                        if self.config["debug"]:
-                            print(f"DEBUG    - ERR, Parents does not match: '{parent}' =/= '{parent_name}' Aborting...")
-                        return markdown
-                    self.update_page(page.title, confluence_body)
-                    for i in MkdocsWithConfluence.tab_nav:
-                        if page.title in i:
-                            print(f"INFO    - Mkdocs With Confluence: {i} *UPDATE*")
+                if self.deferred:
+                    self.publish_queue[page.title] = {
+                        "title": page.title,
+                        "markdown": new_markdown,
+                        "body": confluence_body,
+                        "chain": chain,
+                        "attachments": [],
+                        "source": (page.file.src_path, source_key),
+                    }
                 else:
-                    if self.config["debug"]:
-                        print(
-                            f"DEBUG    - PAGE: {page.title}, PARENT0: {parent}, "
-                            f"PARENT1: {parent1}, MAIN PARENT: {main_parent}"
-                        )
-                    parent_id = self.find_page_id(parent)
-                    self.wait_until(parent_id, 1, 20)
-                    second_parent_id = self.find_page_id(parent1)
-                    self.wait_until(second_parent_id, 1, 20)
-                    main_parent_id = self.find_page_id(main_parent)
-                    if not parent_id:
-                        if not second_parent_id:
-                            main_parent_id = self.find_page_id(main_parent)
-                            if not main_parent_id:
-                                print("ERR: MAIN PARENT UNKNOWN. ABORTING!")
-                                return markdown
-
-                            if self.config["debug"]:
-                                print(
-                                    f"DEBUG    - Trying to ADD page '{parent1}' to "
-                                    f"main parent({main_parent}) ID: {main_parent_id}"
-                                )
-                            body = TEMPLATE_BODY.replace("TEMPLATE", parent1)
-                            self.add_page(parent1, main_parent_id, body)
-                            for i in MkdocsWithConfluence.tab_nav:
-                                if parent1 in i:
-                                    print(f"INFO    - Mkdocs With Confluence: {i} *NEW PAGE*")
-                            time.sleep(1)
-
-                        if self.config["debug"]:
-                            print(
-                                f"DEBUG    - Trying to ADD page '{parent}' "
-                                f"to parent1({parent1}) ID: {second_parent_id}"
-                            )
-                        body = TEMPLATE_BODY.replace("TEMPLATE", parent)
-                        self.add_page(parent, second_parent_id, body)
-                        for i in MkdocsWithConfluence.tab_nav:
-                            if parent in i:
-                                print(f"INFO    - Mkdocs With Confluence: {i} *NEW PAGE*")
-                        time.sleep(1)
-
-                    if parent_id is None:
-                        for i in range(11):
-                            while parent_id is None:
-                                try:
-                                    self.add_page(page.title, parent_id, confluence_body)
-                                except requests.exceptions.HTTPError:
-                                    print(
-                                        f"ERR    - HTTP error on adding page. It probably occured due to "
-                                        f"parent ID('{parent_id}') page is not YET synced on server. Retry nb {i}/10..."
-                                    )
-                                    sleep(5)
-                                    parent_id = self.find_page_id(parent)
-                                break
-
-                    self.add_page(page.title, parent_id, confluence_body)
-
-                    print(f"Trying to ADD page '{page.title}' to parent0({parent}) ID: {parent_id}")
-                    for i in MkdocsWithConfluence.tab_nav:
-                        if page.title in i:
-                            print(f"INFO    - Mkdocs With Confluence: {i} *NEW PAGE*")
+                    failed_sections = self.materialize_hierarchy([chain])
+                    if failed_sections:
+                        self.failed_pages.extend(sorted(failed_sections) + [page.title])
+                        return markdown
+                    if not self.publish_page(page.title, confluence_body, chain):
+                        return markdown
+                self.page_sources[page.title] = (page.file.src_path, source_key)
 
                 if attachments:
                     self.page_attachments[page.title] = attachments
 
             except IndexError as e:
-                if self.config["debug"]:
-                    print(f"DEBUG    - ERR({e}): Exception error!")
+                log.debug("ERR(%s): Exception error!", e)
                 return markdown
 
         return markdown
 
+    def publish_page(self, page_name, confluence_body, chain):
+        parent = chain[-1]
+        page_id = self.find_page_id(page_name)
+        if page_id is not None:
+            log.debug(
+                "JUST ONE STEP FROM UPDATE OF PAGE '%s', CHECKING IF PARENT PAGE ON CONFLUENCE IS THE SAME AS HERE",
+                page_name,
+            )
+
+            parent_name = self.find_parent_name_of_page(page_name)
+
+            if parent_name == parent:
+                log.debug("Parents match. Continue...")
+            else:
+                log.debug("ERR, Parents does not match: '%s' =/= '%s' Aborting...", parent, parent_name)
+                return False
+            updated = self.update_page(page_name, confluence_body)
+            status = "*UPDATE*" if updated else "*NO CHANGE*"
+            log.info("Mkdocs With Confluence: %s %s", self.nav_label(page_name), status)
+        else:
+            parent_id = self.find_page_id(parent)
+            if parent_id is None:
+                log.error("Mkdocs With Confluence: PARENT '%s' OF PAGE '%s' UNKNOWN. SKIPPING!", parent, page_name)
+                return False
+
+            log.debug("Trying to ADD page '%s' to parent0(%s) ID: %s", page_name, parent, parent_id)
+            self.add_page(page_name, parent_id, confluence_body)
+            log.info("Mkdocs With Confluence: %s *NEW PAGE*", self.nav_label(page_name))
+        return True
+
     def on_post_page(self, output, page, config):
+        if not self.enabled or page.title in self.unchanged_pages:
+            return output
         site_dir = config.get("site_dir")
         attachments = self.page_attachments.get(page.title, [])
 
-        if self.config["debug"]:
-            print(f"\nDEBUG    - UPLOADING ATTACHMENTS TO CONFLUENCE FOR {page.title}, DETAILS:")
-            print(f"FILES: {attachments}  \n")
+        log.debug("UPLOADING ATTACHMENTS TO CONFLUENCE FOR %s, FILES: %s", page.title, attachments)
+        paths = []
         for attachment in attachments:
-            if self.config["debug"]:
-                print(f"DEBUG    - looking for {attachment} in {site_dir}")
-            for p in Path(site_dir).rglob(f"*{attachment}"):
-                self.add_or_update_attachment(page.title, p)
+            log.debug("looking for %s in %s", attachment, site_dir)
+            paths.extend(self.find_site_files(site_dir, attachment))
+        paths = list(dict.fromkeys(paths))
+
+        if self.plan is not None:
+            files = [(path, self.get_file_sha1(path), os.path.getsize(path)) for path in paths]
+            self.plan.plan_attachments(page.title, files)
+            return output
+        if self.live is not None and self.live_track(page.title, paths):
+            return output
+        queued_page = self.publish_queue.get(page.title)
+        if queued_page is not None:
+            queued_page["attachments"].extend(paths)
+        elif page.title in self.page_sources:
+            self.save_page_state(page.title, self.sync_attachments(page.title, paths))
         return output
 
+    def find_site_files(self, site_dir, attachment):
+        if self.site_files is None:
+            # One walk of the built site, then every attachment is a dictionary lookup
+            self.site_files = {}
+            for root, dirs, filenames in os.walk(site_dir):
+                for filename in filenames:
+                    path = Path(root, filename)
+                    self.site_files.setdefault(filename, []).append(path)
+        if os.path.isabs(attachment) and os.path.isfile(attachment):
+            return [Path(attachment)]
+        attachment = attachment.replace("\\", "/").strip("/")
+        paths = self.site_files.get(os.path.basename(attachment), [])
+        if "/" not in attachment:
+            return paths
+        suffix = "/" + attachment
+        return [p for p in paths if p.as_posix().endswith(suffix)]
+
+    def on_post_build(self, config):
+        if not self.enabled:
+            return
+        if self.plan is not None:
+            self.write_plan()
+        if self.live_batch:
+            log.info("Mkdocs With Confluence: %d changed pages queued for live publishing", len(self.live_batch))
+            self.live.submit(self.live_batch.values())
+            self.live_batch = {}
+        try:
+            if self.publish_queue:
+                self.render_queued_pages()
+                self.publish_deferred()
+        finally:
+            # What was published is kept even when the build fails
+            if self.state is not None:
+                self.state.commit()
+            if self.hashes is not None:
+                self.hashes.save()
+            if self.artifact_writer is not None:
+                self.artifact_writer.shutdown(wait=True)
+                self.artifact_writer = None
+            self.report_metrics()
+            self.live_ready = self.live is not None
+        if self.failed_pages:
+            # Under `mkdocs serve`, the next rebuild sees these pages as changed and publishes them again
+            for title in self.failed_pages:
+                self.live_bodies.pop(title, None)
+                self.live_assets.pop(title, None)
+            failed, self.failed_pages = list(dict.fromkeys(self.failed_pages)), []
+            raise PluginError(
+                f"Mkdocs With Confluence: {len(failed)} pages could not be published: {', '.join(failed)}"
+            )
+
+    def plan_page(self, page_name, confluence_body, chain):
+        for depth in range(1, len(chain)):
+            self.plan.plan_section(chain[depth], chain[depth - 1])
+        action = self.plan.plan_page(page_name, chain[-1], confluence_body, self.get_body_sha1(confluence_body))
+        log.info("Mkdocs With Confluence: %s *PLAN: %s*", self.nav_label(page_name), action.upper())
+
+    def write_plan(self):
+        self.plan.write(self.config["plan_file"])
+        summary = self.plan.summary()
+        log.info(
+            "Mkdocs With Confluence: Plan written to %s - pages %s (%d bytes), attachments %s (%d bytes)",
+            self.config["plan_file"],
+            summary["pages"],
+            summary["page_bytes"],
+            summary["attachments"],
+            summary["attachment_bytes"],
+        )
+
+    def load_snapshot(self):
+        path = self.config["plan_snapshot"]
+        if path and os.path.exists(path):
+            log.info("Mkdocs With Confluence: Remote state loaded from %s", path)
+            return read_json(path)
+        snapshot = self.fetch_snapshot()
+        if path:
+            write_json(path, snapshot)
+            log.info("Mkdocs With Confluence: Remote state saved to %s", path)
+        return snapshot
+
+    @timed("fetch_snapshot")
+    def fetch_snapshot(self):
+        # Pages of the space with their parent, version and attachments, in as few listing requests as possible
+        params = {
+            "spaceKey": self.config["space"],
+            "type": "page",
+            "expand": "version,ancestors,children.attachment.version",
+            "limit": 100,
+            "start": 0,
+        }
+        pages = {}
+        while True:
+            r = self.scheduler.request("GET", self.config["host_url"], params=params)
+            r.raise_for_status()
+            response_json = r.json()
+            for result in response_json["results"]:
+                entry = self.__index_entry(result)
+                listing = (result.get("children") or {}).get("attachment") or {}
+                if "next" in listing.get("_links", {}):
+                    # Expanded children are truncated, pages with many attachments get a listing of their own
+                    attachments = self.get_attachments(result["id"]).values()
+                else:
+                    attachments = listing.get("results", [])
+                entry["attachments"] = {
+                    attachment["title"]: {
+                        "id": attachment["id"],
+                        "version": (attachment.get("version") or {}).get("number"),
+                        "message": (attachment.get("version") or {}).get("message", ""),
+                        "size": (attachment.get("extensions") or {}).get("fileSize"),
+                    }
+                    for attachment in attachments
+                }
+                pages[entry["title"]] = entry
+            if not response_json["results"] or "next" not in response_json.get("_links", {}):
+                break
+            params["start"] += len(response_json["results"])
+        log.debug("SNAPSHOT: %d pages", len(pages))
+        return {"space": self.config["space"], "taken": time.time(), "pages": pages}
+
+    def report_metrics(self):
+        if self.config["metrics"]:
+            log.info("Mkdocs With Confluence: Metrics")
+            for line in self.metrics.table().splitlines():
+                log.info("  %s", line)
+        if self.config["metrics_file"]:
+            self.metrics.write(self.config["metrics_file"])
+            log.info("Mkdocs With Confluence: Metrics written to %s", self.config["metrics_file"])
+
+    @timed("render_pool")
+    def render_queued_pages(self):
+        queue = [item for item in self.publish_queue.values() if item["body"] is None]
+        if not queue:
+            return
+        from concurrent.futures import ProcessPoolExecutor
+
+        workers = self.config["render_workers"]
+        log.info("Mkdocs With Confluence: Rendering %d pages with %d processes...", len(queue), workers)
+        chunksize = max(1, len(queue) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_render_worker) as executor:
+            bodies = executor.map(render_in_worker, [item["markdown"] for item in queue], chunksize=chunksize)
+            for item, confluence_body in zip(queue, bodies):
+                item["body"] = confluence_body
+                if self.render_cache is not None:
+                    self.render_cache.put(item["markdown"], confluence_body)
+                self.after_render(item["title"], confluence_body)
+
+    def after_render(self, page_name, confluence_body):
+        log.debug("%s", confluence_body)
+        if self.live is not None:
+            self.live_bodies[page_name] = self.get_body_sha1(confluence_body)
+        if self.config["artifacts_dir"]:
+            self.write_artifact(page_name, confluence_body)
+
+    @timed("render")
+    def render_page(self, markdown):
+        if self.render_cache is None:
+            return self.confluence_mistune(markdown)
+        confluence_body = self.render_cache.get(markdown)
+        if confluence_body is None:
+            self.metrics.count("render_cache.misses")
+            confluence_body = self.confluence_mistune(markdown)
+            self.render_cache.put(markdown, confluence_body)
+        else:
+            self.metrics.count("render_cache.hits")
+        return confluence_body
+
+    def write_artifact(self, page_name, confluence_body):
+        # Debug copies of the storage bodies are written off the render path by a single background thread
+        if self.artifact_writer is None:
+            os.makedirs(self.config["artifacts_dir"], exist_ok=True)
+            self.artifact_writer = ThreadPoolExecutor(max_workers=1)
+        path = os.path.join(self.config["artifacts_dir"], "confluence_page_" + page_name.replace(" ", "_") + ".html")
+        self.artifact_writer.submit(Path(path).write_text, confluence_body, encoding="utf-8")
+
+    def get_source_key(self, markdown, chain, attachments, config):
+        # Everything a published page depends on: its markdown, the renderer versions, its place in the nav and its
+        # attachments
+        source_hash = hashlib.sha1(self.render_salt.encode("utf-8"))
+        source_hash.update(b"\0" + markdown.encode("utf-8"))
+        source_hash.update("\0".join(chain).encode("utf-8"))
+        for attachment in attachments:
+            path = attachment if os.path.isabs(attachment) else os.path.join(config["docs_dir"], attachment)
+            try:
+                stat = os.stat(path)
+                source_hash.update(f"\0{attachment}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+            except OSError:
+                source_hash.update(f"\0{attachment}:missing".encode("utf-8"))
+        return source_hash.hexdigest()
+
+    def is_page_unchanged(self, page_name, source_key):
+        if self.state is None or self.page_index is None:
+            return False
+        saved = self.state.get_page(page_name)
+        entry = self.page_index.get(page_name)
+        return (
+            saved is not None
+            and entry is not None
+            and saved["source_key"] == source_key
+            and saved["page_id"] == entry["id"]
+            and saved["version"] == entry["version"]
+        )
+
+    def save_page_state(self, page_name, attachment_hashes, source=None):
+        if source is None:
+            source = self.page_sources.pop(page_name, None)
+        if self.state is None or self.dryrun or source is None:
+            return
+        src_path, source_key = source
+        self.state.save_source(page_name, src_path, source_key, attachment_hashes)
+
+    def state_verification_due(self):
+        builds = int(self.state.get_meta("builds_since_verify", self.config["state_verify_interval"]))
+        if builds >= self.config["state_verify_interval"] or not self.state.pages():
+            return True
+        self.state.set_meta("builds_since_verify", builds + 1)
+        # Counted even if this build fails, or a state that went wrong would never be verified again
+        self.state.commit()
+        return False
+
+    def load_page_index(self):
+        # Between verifications the index comes from the local state, without a single request
+        log.debug("PAGE INDEX loaded from %s", self.state.path)
+        self.created_pages = {}
+        self.page_index = {}
+        self.page_titles = {}
+        for saved in self.state.pages():
+            self.page_index[saved["title"]] = {
+                "id": saved["page_id"],
+                "title": saved["title"],
+                "version": saved["version"],
+                "message": saved["message"],
+                "parent": saved["parent"],
+                "parent_id": saved["parent_id"],
+            }
+            self.page_titles[saved["page_id"]] = saved["title"]
+
+    @timed("publish_deferred")
+    def publish_deferred(self):
+        queue = list(self.publish_queue.values())
+        self.publish_queue = {}
+        self.failed_pages.extend(self.publish_items(queue))
+
+    def publish_items(self, queue):
+        # Returns the titles of the pages that failed, every other page is still published
+        if self.targets:
+            return self.publish_to_targets(queue)
+        log.info(
+            "Mkdocs With Confluence: Publishing %d pages with %d workers...", len(queue), self.config["publish_workers"]
+        )
+        with ThreadPoolExecutor(max_workers=max(1, self.config["publish_workers"])) as executor:
+            failed_sections = self.materialize_hierarchy([item["chain"] for item in queue], executor)
+            # A page is only published below sections that exist, the others are failed along with their section
+            blocked = [item["title"] for item in queue if failed_sections.intersection(item["chain"])]
+            for title in blocked:
+                self.metrics.count("pages.failed")
+                log.error("Mkdocs With Confluence: %s *FAILED*: parent section not created", self.nav_label(title))
+            queue = [item for item in queue if not failed_sections.intersection(item["chain"])]
+            failed = sorted(failed_sections) + blocked
+            return failed + [title for title in executor.map(self.publish_queued_page, queue) if title is not None]
+
+    def build_targets(self, config):
+        # One plugin instance per target: the top level options with the target ones on top, and its own transport,
+        # rate limiter, page index and state. Pages are rendered once, by this instance.
+        for target in self.targets:
+            target.close_transport()
+        targets = []
+        options = {key: value for key, value in self.config.items() if key != "targets"}
+        credentials = ("username", "password", "api_token")
+        for number, target_options in enumerate(self.config["targets"], 1):
+            if not isinstance(target_options, dict):
+                log.error("Mkdocs With Confluence: TARGET %d IS NOT A MAPPING. SKIPPING!", number)
+                continue
+            target_options = dict(target_options)
+            space = target_options.get("space", self.config["space"])
+            host = urlsplit(target_options.get("host_url", self.config["host_url"]) or "").netloc
+            name = target_options.pop("name", None) or f"{space}@{host}"
+            merged = dict(options)
+            if any(key in target_options for key in credentials):
+                # Credentials are not mixed between the top level and a target
+                merged.update(dict.fromkeys(credentials))
+            merged.update(target_options)
+            if merged["incremental"] and not target_options.get("state_file"):
+                slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+                config_dir = os.path.dirname(config["config_file_path"])
+                merged["state_file"] = os.path.join(config_dir, f".mkdocs-with-confluence-{slug}.db")
+            target = MkdocsWithConfluence()
+            errors, warnings = target.load_config(merged, config["config_file_path"])
+            for key, warning in warnings:
+                log.warning("Mkdocs With Confluence: target '%s', option '%s': %s", name, key, warning)
+            if errors:
+                for key, error in errors:
+                    log.error("Mkdocs With Confluence: target '%s', option '%s': %s", name, key, error)
+                log.error("Mkdocs With Confluence: TARGET '%s' HAS INVALID OPTIONS. SKIPPING!", name)
+                continue
+            target.target_name = name
+            target.metrics = self.metrics
+            target.hashes = self.hashes
+            target.on_config(config)
+            targets.append(target)
+        return targets
+
+    @timed("publish_targets")
+    def publish_to_targets(self, queue):
+        # A thread per target, so a slow target does not hold up the others
+        # A page that failed on any target is failed, the target is in the log
+        with ThreadPoolExecutor(max_workers=len(self.targets)) as executor:
+            failures = executor.map(self.publish_to_target, self.targets, [queue] * len(self.targets))
+            return list(dict.fromkeys(title for target_failures in failures for title in target_failures))
+
+    def publish_to_target(self, target, queue):
+        try:
+            # Under `mkdocs serve` the index of the first build is kept up to date by our own writes
+            if target.page_index is None or not self.live_ready:
+                if target.state is not None and not target.state_verification_due():
+                    target.load_page_index()
+                else:
+                    target.build_page_index()
+            target.source_files = self.source_files
+            target.nav_labels = {title: f"[{target.target_name}] {label}" for title, label in self.nav_labels.items()}
+            # The nav below the root is the same everywhere, the root page is the one of the target
+            root = target.config["parent_page_name"] or target.config["space"]
+            items, failed = [], []
+            for item in queue:
+                if target.is_page_unchanged(item["title"], item["source"][1]):
+                    self.metrics.count("pages.unchanged")
+                    log.info("Mkdocs With Confluence: %s *NO CHANGE*", target.nav_label(item["title"]))
+                else:
+                    items.append(dict(item, chain=[root] + item["chain"][1:]))
+            if items:
+                failed = target.publish_items(items)
+        except Exception as e:
+            log.error("Mkdocs With Confluence: Publishing to target '%s' failed: %s", target.target_name, e)
+            failed = [item["title"] for item in queue]
+        finally:
+            if target.state is not None:
+                target.state.commit()
+        return failed
+
+    def live_track(self, page_name, paths):
+        # Remembers the body and attachment hashes each page was last published with; on a rebuild, queues the page
+        # if either changed
+        asset_hashes = {os.path.basename(path): self.get_file_sha1(path) for path in paths}
+        live_page = self.live_pages.pop(page_name, None)
+        if live_page is None:
+            self.live_assets[page_name] = asset_hashes
+            return False
+        if live_page["changed"] or asset_hashes != self.live_assets.get(page_name):
+            # Uploaded from docs_dir, the next rebuild may clean site_dir while the batch runs
+            live_page["attachments"] = [self.source_file(path) for path in paths]
+            live_page["asset_hashes"] = asset_hashes
+            self.live_batch[page_name] = live_page
+        else:
+            # Back to what is published, a failed earlier version must not go out
+            self.live.discard(page_name)
+        return True
+
+    def publish_live_batch(self, batch):
+        # Runs on the debounce timer thread, an error must not get lost in it. Returns the pages that failed, the
+        # publisher sends them again with its next batch.
+        try:
+            failed = set(self.publish_items(batch))
+        except Exception as e:
+            log.error("Mkdocs With Confluence: Live publishing failed: %s", e)
+            failed = {item["title"] for item in batch}
+        finally:
+            if self.state is not None:
+                self.state.commit()
+            self.hashes.save()
+        for item in batch:
+            if item["title"] not in failed:
+                self.live_bodies[item["title"]] = item["body_hash"]
+                self.live_assets[item["title"]] = item["asset_hashes"]
+        if failed:
+            log.error(
+                "Mkdocs With Confluence: Live publishing failed for %d pages, retried with the next batch: %s",
+                len(failed),
+                ", ".join(sorted(failed)),
+            )
+        else:
+            log.info("Mkdocs With Confluence: Live publishing of %d pages done", len(batch))
+        return [item for item in batch if item["title"] in failed]
+
+    def materialize_hierarchy(self, chains, executor=None):
+        # Breadth-first: every missing section page is created once, after its parent. Returns the sections that
+        # could not be created, sections below them are not attempted.
+        failed = set()
+        for depth in range(1, max((len(chain) for chain in chains), default=0)):
+            sections = {}
+            for chain in chains:
+                if len(chain) <= depth:
+                    continue
+                if chain[depth - 1] in failed:
+                    failed.add(chain[depth])
+                elif self.find_page_id(chain[depth]) is None:
+                    sections.setdefault(chain[depth], chain[depth - 1])
+            if executor is not None:
+                created = executor.map(self.add_section, sections.keys(), sections.values())
+            else:
+                created = (self.add_section(section_name, sections[section_name]) for section_name in sections)
+            failed.update(section_name for section_name, ok in zip(sections, created) if not ok)
+        return failed
+
+    def add_section(self, section_name, parent_name):
+        from requests.exceptions import RequestException
+
+        parent_id = self.find_page_id(parent_name)
+        if parent_id is None:
+            log.error(
+                "Mkdocs With Confluence: PARENT '%s' OF SECTION '%s' UNKNOWN. SKIPPING!", parent_name, section_name
+            )
+            return False
+        try:
+            self.add_page(section_name, parent_id, TEMPLATE_BODY.replace("TEMPLATE", section_name))
+        except RequestException as e:
+            self.metrics.count("pages.failed")
+            log.error("Mkdocs With Confluence: %s *FAILED*: %s", self.nav_label(section_name), e)
+            return False
+        log.info("Mkdocs With Confluence: %s *NEW PAGE*", self.nav_label(section_name))
+        return True
+
+    def publish_queued_page(self, item):
+        from requests.exceptions import RequestException
+
+        try:
+            if self.publish_page(item["title"], item["body"], item["chain"]):
+                attachment_hashes = self.sync_attachments(item["title"], item["attachments"])
+                self.save_page_state(item["title"], attachment_hashes, item.get("source"))
+        except (RequestException, OSError) as e:
+            self.metrics.count("pages.failed")
+            log.error("Mkdocs With Confluence: %s *FAILED*: %s", self.nav_label(item["title"]), e)
+            return item["title"]
+        return None
+
     def on_page_content(self, html, page, config, files):
         return html
 
-    def __get_page_url(self, section):
-        return re.search("url='(.*)'\\)", section).group(1)[:-1] + ".md"
+    @timed("hash_attachment")
+    def get_file_sha1(self, file_path):
+        return self.hashes.sha1(self.source_file(file_path))
 
-    def __get_page_name(self, section):
-        return os.path.basename(re.search("url='(.*)'\\)", section).group(1)[:-1])
+    def source_file(self, file_path):
+        # Anything MkDocs did not copy from docs_dir (generated or rewritten after the copy) is hashed as it is
+        return self.source_files.get(os.path.normpath(os.path.abspath(file_path)), file_path)
 
-    def __get_section_name(self, section):
-        if self.config["debug"]:
-            print(f"DEBUG    - SECTION name: {section}")
-        return os.path.basename(re.search("url='(.*)'\\/", section).group(1)[:-1])
+    def get_body_sha1(self, page_content_in_storage_format):
+        return hashlib.sha1(page_content_in_storage_format.encode("utf-8")).hexdigest()
 
-    def __get_section_title(self, section):
-        if self.config["debug"]:
-            print(f"DEBUG    - SECTION title: {section}")
-        try:
-            r = re.search("Section\\(title='(.*)'\\)", section)
-            return r.group(1)
-        except AttributeError:
-            name = self.__get_section_name(section)
-            print(f"WRN    - Section '{name}' doesn't exist in the mkdocs.yml nav section!")
-            return name
-
-    def __get_page_title(self, section):
-        try:
-            r = re.search("\\s*Page\\(title='(.*)',", section)
-            return r.group(1)
-        except AttributeError:
-            name = self.__get_page_url(section)
-            print(f"WRN    - Page '{name}' doesn't exist in the mkdocs.yml nav section!")
-            return name
-
-    # Adapted from https://stackoverflow.com/a/3431838
-    def get_file_sha1(self, file_path):
-        hash_sha1 = hashlib.sha1()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_sha1.update(chunk)
-        return hash_sha1.hexdigest()
-
-    def add_or_update_attachment(self, page_name, filepath):
-        print(f"INFO    - Mkdocs With Confluence * {page_name} *ADD/Update ATTACHMENT if required* {filepath}")
-        if self.config["debug"]:
-            print(f" * Mkdocs With Confluence: Add Attachment: PAGE NAME: {page_name}, FILE: {filepath}")
+    @timed("sync_attachments")
+    def sync_attachments(self, page_name, filepaths):
+        if not filepaths:
+            return {}
+        log.debug(" * Mkdocs With Confluence: Sync Attachments: PAGE NAME: %s, FILES: %s", page_name, filepaths)
         page_id = self.find_page_id(page_name)
-        if page_id:
-            file_hash = self.get_file_sha1(filepath)
+        if not page_id:
+            log.debug("PAGE DOES NOT EXISTS")
+            return {}
+        self.hashes.prefetch(self.source_file(filepath) for filepath in filepaths)
+        file_hashes = {filepath: self.get_file_sha1(filepath) for filepath in filepaths}
+        attachment_hashes = {os.path.basename(filepath): file_hash for filepath, file_hash in file_hashes.items()}
+        saved = self.state.get_page(page_name) if self.state is not None else None
+        if (
+            saved is not None
+            and saved["page_id"] == page_id
+            and attachment_hashes.items() <= saved["attachments"].items()
+        ):
+            log.debug(" * Mkdocs With Confluence * %s * Attachments unchanged since last publish", page_name)
+            self.metrics.count("attachments.unchanged", len(attachment_hashes))
+            return attachment_hashes
+        if page_id.startswith(DRYRUN_PAGE_ID):
+            existing_attachments = {}
+        else:
+            existing_attachments = self.get_attachments(page_id)
+        new_attachments = []
+        for filepath, file_hash in file_hashes.items():
+            log.info("Mkdocs With Confluence * %s *ADD/Update ATTACHMENT if required* %s", page_name, filepath)
             attachment_message = f"MKDocsWithConfluence [v{file_hash}]"
-            existing_attachment = self.get_attachment(page_id, filepath)
+            existing_attachment = existing_attachments.get(os.path.basename(filepath))
             if existing_attachment:
-                file_hash_regex = re.compile(r"\[v([a-f0-9]{40})]$")
-                existing_match = file_hash_regex.search(existing_attachment["version"]["message"])
+                existing_match = VERSION_HASH_REGEX.search(existing_attachment["version"].get("message", ""))
                 if existing_match is not None and existing_match.group(1) == file_hash:
-                    if self.config["debug"]:
-                        print(f" * Mkdocs With Confluence * {page_name} * Existing attachment skipping * {filepath}")
+                    self.metrics.count("attachments.unchanged")
+                    log.debug(" * Mkdocs With Confluence * %s * Existing attachment skipping * %s", page_name, filepath)
                 else:
                     self.update_attachment(page_id, filepath, existing_attachment, attachment_message)
             else:
-                self.create_attachment(page_id, filepath, attachment_message)
-        else:
-            if self.config["debug"]:
-                print("PAGE DOES NOT EXISTS")
-
-    def get_attachment(self, page_id, filepath):
-        name = os.path.basename(filepath)
-        if self.config["debug"]:
-            print(f" * Mkdocs With Confluence: Get Attachment: PAGE ID: {page_id}, FILE: {filepath}")
-
+                new_attachments.append((filepath, attachment_message))
+        failed = self.create_attachments(page_id, new_attachments)
+        if failed:
+            from requests.exceptions import HTTPError
+
+            # The page fails and keeps no state, so the next build uploads these files again
+            raise HTTPError(f"{len(failed)} attachments not uploaded: {', '.join(map(str, failed))}")
+        return attachment_hashes
+
+    @timed("get_attachments")
+    def get_attachments(self, page_id):
+        log.debug(" * Mkdocs With Confluence: Get Attachments: PAGE ID: %s", page_id)
         url = self.config["host_url"] + "/" + page_id + "/child/attachment"
         headers = {"X-Atlassian-Token": "no-check"}  # no content-type here!
-        if self.config["debug"]:
-            print(f"URL: {url}")
-
-        r = self.session.get(url, headers=headers, params={"filename": name, "expand": "version"})
-        r.raise_for_status()
-        with nostdout():
+        params = {"expand": "version", "limit": 200, "start": 0}
+        attachments = {}
+        while True:
+            r = self.scheduler.request("GET", url, headers=headers, params=params)
+            r.raise_for_status()
             response_json = r.json()
-        if response_json["size"]:
-            return response_json["results"][0]
+            for attachment in response_json["results"]:
+                attachments[attachment["title"]] = attachment
+            if not response_json["results"] or "next" not in response_json.get("_links", {}):
+                return attachments
+            params["start"] += len(response_json["results"])
 
+    @timed("update_attachment")
     def update_attachment(self, page_id, filepath, existing_attachment, message):
-        if self.config["debug"]:
-            print(f" * Mkdocs With Confluence: Update Attachment: PAGE ID: {page_id}, FILE: {filepath}")
+        log.debug(" * Mkdocs With Confluence: Update Attachment: PAGE ID: %s, FILE: %s", page_id, filepath)
 
         url = self.config["host_url"] + "/" + page_id + "/child/attachment/" + existing_attachment["id"] + "/data"
-        headers = {"X-Atlassian-Token": "no-check"}  # no content-type here!
-
-        if self.config["debug"]:
-            print(f"URL: {url}")
-
-        filename = os.path.basename(filepath)
-
-        # determine content-type
-        content_type, encoding = mimetypes.guess_type(filepath)
-        if content_type is None:
-            content_type = "multipart/form-data"
-        files = {"file": (filename, open(Path(filepath), "rb"), content_type), "comment": message}
+        log.debug("URL: %s", url)
 
         if not self.dryrun:
-            r = self.session.post(url, headers=headers, files=files)
+            stream = MultipartStream()
+            stream.add_file("file", filepath)
+            stream.add_field("comment", message)
+            r = self.post_multipart(url, stream)
             r.raise_for_status()
-            print(r.json())
-            if r.status_code == 200:
-                print("OK!")
-            else:
-                print("ERR!")
+            log.debug("%s %s", "OK!" if r.status_code == 200 else "ERR!", r.text)
 
+    @timed("create_attachment")
     def create_attachment(self, page_id, filepath, message):
-        if self.config["debug"]:
-            print(f" * Mkdocs With Confluence: Create Attachment: PAGE ID: {page_id}, FILE: {filepath}")
+        log.debug(" * Mkdocs With Confluence: Create Attachment: PAGE ID: %s, FILE: %s", page_id, filepath)
 
         url = self.config["host_url"] + "/" + page_id + "/child/attachment"
-        headers = {"X-Atlassian-Token": "no-check"}  # no content-type here!
-
-        if self.config["debug"]:
-            print(f"URL: {url}")
+        log.debug("URL: %s", url)
 
-        filename = os.path.basename(filepath)
-
-        # determine content-type
-        content_type, encoding = mimetypes.guess_type(filepath)
-        if content_type is None:
-            content_type = "multipart/form-data"
-        files = {"file": (filename, open(filepath, "rb"), content_type), "comment": message}
         if not self.dryrun:
-            r = self.session.post(url, headers=headers, files=files)
-            print(r.json())
+            stream = MultipartStream()
+            stream.add_file("file", filepath)
+            stream.add_field("comment", message)
+            r = self.post_multipart(url, stream)
+            log.debug("%s", r.text)
             r.raise_for_status()
-            if r.status_code == 200:
-                print("OK!")
+            log.debug("OK!" if r.status_code == 200 else "ERR!")
+
+    def create_attachments(self, page_id, attachments):
+        # New attachments go out in multipart batches bounded by file count and size. Returns the files that could
+        # not be uploaded.
+        failed = []
+        batch, batch_bytes = [], 0
+        for filepath, message in attachments:
+            size = os.path.getsize(filepath)
+            if batch and (
+                len(batch) >= self.config["attachment_batch_files"]
+                or batch_bytes + size > self.config["attachment_batch_bytes"]
+            ):
+                failed.extend(self.create_attachment_batch(page_id, batch))
+                batch, batch_bytes = [], 0
+            batch.append((filepath, message))
+            batch_bytes += size
+        if batch:
+            failed.extend(self.create_attachment_batch(page_id, batch))
+        return failed
+
+    @timed("create_attachment_batch")
+    def create_attachment_batch(self, page_id, batch):
+        # Returns the files of the batch that could not be uploaded
+        from requests.exceptions import RequestException
+
+        if len(batch) == 1 or self.dryrun:
+            failed = []
+            for filepath, message in batch:
+                try:
+                    self.create_attachment(page_id, filepath, message)
+                except RequestException as e:
+                    log.error("Mkdocs With Confluence: Cannot upload attachment %s: %s", filepath, e)
+                    failed.append(filepath)
+            return failed
+        log.debug(" * Mkdocs With Confluence: Create Attachments: PAGE ID: %s, FILES: %s", page_id, batch)
+
+        url = self.config["host_url"] + "/" + page_id + "/child/attachment"
+
+        stream = MultipartStream()
+        for filepath, message in batch:
+            stream.add_file("file", filepath)
+        # Confluence pairs the n-th comment with the n-th file
+        for filepath, message in batch:
+            stream.add_field("comment", message)
+        r = self.post_multipart(url, stream)
+        if r.status_code != 200:
+            log.error("Mkdocs With Confluence: Batch upload failed (%s), uploading files one by one", r.status_code)
+            failed = []
+            for attachment in batch:
+                failed.extend(self.create_attachment_batch(page_id, [attachment]))
+            return failed
+        uploaded = {result["title"] for result in r.json()["results"]}
+        failed = []
+        for filepath, message in batch:
+            if os.path.basename(filepath) in uploaded:
+                log.debug("OK! %s", filepath)
             else:
-                print("ERR!")
+                log.error("Mkdocs With Confluence: Attachment %s missing from the upload response", filepath)
+                failed.append(filepath)
+        return failed
+
+    def post_multipart(self, url, stream):
+        headers = {"X-Atlassian-Token": "no-check", "Content-Type": stream.content_type}
+        with stream, self.upload_budget.reserve(len(stream)):
+            return self.scheduler.request("POST", url, headers=headers, data=stream)
 
+    @timed("find_page_id")
     def find_page_id(self, page_name):
-        if self.config["debug"]:
-            print(f"INFO    -   * Mkdocs With Confluence: Find Page ID: PAGE NAME: {page_name}")
+        log.debug("  * Mkdocs With Confluence: Find Page ID: PAGE NAME: %s", page_name)
+        if page_name in self.created_pages:
+            return self.created_pages[page_name]
+        if self.page_index is not None:
+            entry = self.page_index.get(page_name)
+            return entry["id"] if entry else None
         name_confl = page_name.replace(" ", "+")
         url = self.config["host_url"] + "?title=" + name_confl + "&spaceKey=" + self.config["space"] + "&expand=history"
-        if self.config["debug"]:
-            print(f"URL: {url}")
-        r = self.session.get(url)
+        log.debug("URL: %s", url)
+        r = self.scheduler.request("GET", url)
         r.raise_for_status()
-        with nostdout():
-            response_json = r.json()
+        response_json = r.json()
         if response_json["results"]:
-            if self.config["debug"]:
-                print(f"ID: {response_json['results'][0]['id']}")
+            log.debug("ID: %s", response_json["results"][0]["id"])
             return response_json["results"][0]["id"]
         else:
-            if self.config["debug"]:
-                print("PAGE DOES NOT EXIST")
+            log.debug("PAGE DOES NOT EXIST")
             return None
 
+    @timed("add_page")
     def add_page(self, page_name, parent_page_id, page_content_in_storage_format):
-        print(f"INFO    -   * Mkdocs With Confluence: {page_name} - *NEW PAGE*")
-
-        if self.config["debug"]:
-            print(f" * Mkdocs With Confluence: Adding Page: PAGE NAME: {page_name}, parent ID: {parent_page_id}")
+        log.debug(" * Mkdocs With Confluence: Adding Page: PAGE NAME: %s, parent ID: %s", page_name, parent_page_id)
         url = self.config["host_url"] + "/"
-        if self.config["debug"]:
-            print(f"URL: {url}")
+        log.debug("URL: %s", url)
         headers = {"Content-Type": "application/json"}
         space = self.config["space"]
         data = {
@@ -537,30 +1187,42 @@ class MkdocsWithConfluence(BasePlugin):
             "space": {"key": space},
             "ancestors": [{"id": parent_page_id}],
             "body": {"storage": {"value": page_content_in_storage_format, "representation": "storage"}},
+            # The body hash lets the next build skip the page when it did not change, like after update_page
+            "version": {"message": f"MKDocsWithConfluence [v{self.get_body_sha1(page_content_in_storage_format)}]"},
         }
-        if self.config["debug"]:
-            print(f"DATA: {data}")
+        log.debug("DATA: %s", data)
+        page_id = None
         if not self.dryrun:
-            r = self.session.post(url, json=data, headers=headers)
+            r = self.scheduler.request("POST", url, json=data, headers=headers)
             r.raise_for_status()
             if r.status_code == 200:
-                if self.config["debug"]:
-                    print("OK!")
+                response_json = r.json()
+                page_id = response_json["id"]
+                self.index_page(response_json, parent_page_id)
+                log.debug("OK!")
             else:
-                if self.config["debug"]:
-                    print("ERR!")
+                log.debug("ERR!")
+        else:
+            # Lets children of pages that are not really created resolve their parent
+            page_id = DRYRUN_PAGE_ID + page_name
+        if page_id is not None:
+            self.created_pages[page_name] = page_id
+        return page_id
 
+    @timed("update_page")
     def update_page(self, page_name, page_content_in_storage_format):
         page_id = self.find_page_id(page_name)
-        print(f"INFO    -   * Mkdocs With Confluence: {page_name} - *UPDATE*")
-        if self.config["debug"]:
-            print(f" * Mkdocs With Confluence: Update PAGE ID: {page_id}, PAGE NAME: {page_name}")
+        log.debug(" * Mkdocs With Confluence: Update PAGE ID: %s, PAGE NAME: %s", page_id, page_name)
         if page_id:
+            page_hash = self.get_body_sha1(page_content_in_storage_format)
+            if self.find_page_hash(page_name) == page_hash:
+                self.metrics.count("pages.body_unchanged")
+                log.debug(" * Mkdocs With Confluence * %s * Page body unchanged, skipping update", page_name)
+                return False
             page_version = self.find_page_version(page_name)
             page_version = page_version + 1
             url = self.config["host_url"] + "/" + page_id
-            if self.config["debug"]:
-                print(f"URL: {url}")
+            log.debug("URL: %s", url)
             headers = {"Content-Type": "application/json"}
             space = self.config["space"]
             data = {
@@ -569,60 +1231,149 @@ class MkdocsWithConfluence(BasePlugin):
                 "type": "page",
                 "space": {"key": space},
                 "body": {"storage": {"value": page_content_in_storage_format, "representation": "storage"}},
-                "version": {"number": page_version},
+                "version": {"number": page_version, "message": f"MKDocsWithConfluence [v{page_hash}]"},
             }
 
             if not self.dryrun:
-                r = self.session.put(url, json=data, headers=headers)
+                r = self.scheduler.request("PUT", url, json=data, headers=headers)
+                if r.status_code == 409:
+                    # The index (or the local state it came from) is behind Confluence: publish on top of the
+                    # current version, and have the next build verify the state
+                    current_version = self.fetch_page_version(page_id)
+                    log.warning(
+                        "Mkdocs With Confluence: %s is at version %s on Confluence, not %s. Publishing on top of it",
+                        page_name,
+                        current_version,
+                        page_version - 1,
+                    )
+                    if self.state is not None:
+                        self.state.set_meta("builds_since_verify", self.config["state_verify_interval"])
+                    data["version"]["number"] = current_version + 1
+                    r = self.scheduler.request("PUT", url, json=data, headers=headers)
                 r.raise_for_status()
                 if r.status_code == 200:
-                    if self.config["debug"]:
-                        print("OK!")
+                    self.index_page(r.json())
+                    log.debug("OK!")
                 else:
-                    if self.config["debug"]:
-                        print("ERR!")
+                    log.debug("ERR!")
+            return True
         else:
-            if self.config["debug"]:
-                print("PAGE DOES NOT EXIST YET!")
+            log.debug("PAGE DOES NOT EXIST YET!")
+            return False
 
+    @timed("fetch_page_version")
+    def fetch_page_version(self, page_id):
+        r = self.scheduler.request("GET", self.config["host_url"] + "/" + page_id, params={"expand": "version"})
+        r.raise_for_status()
+        return r.json()["version"]["number"]
+
+    @timed("find_page_version")
     def find_page_version(self, page_name):
-        if self.config["debug"]:
-            print(f"INFO    -   * Mkdocs With Confluence: Find PAGE VERSION, PAGE NAME: {page_name}")
+        log.debug("  * Mkdocs With Confluence: Find PAGE VERSION, PAGE NAME: %s", page_name)
+        if self.page_index is not None:
+            entry = self.page_index.get(page_name)
+            return entry["version"] if entry else None
         name_confl = page_name.replace(" ", "+")
         url = self.config["host_url"] + "?title=" + name_confl + "&spaceKey=" + self.config["space"] + "&expand=version"
-        r = self.session.get(url)
+        r = self.scheduler.request("GET", url)
         r.raise_for_status()
-        with nostdout():
-            response_json = r.json()
+        response_json = r.json()
         if response_json["results"] is not None:
-            if self.config["debug"]:
-                print(f"VERSION: {response_json['results'][0]['version']['number']}")
+            log.debug("VERSION: %s", response_json["results"][0]["version"]["number"])
             return response_json["results"][0]["version"]["number"]
         else:
-            if self.config["debug"]:
-                print("PAGE DOES NOT EXISTS")
+            log.debug("PAGE DOES NOT EXISTS")
             return None
 
+    @timed("find_page_hash")
+    def find_page_hash(self, page_name):
+        if self.page_index is not None:
+            entry = self.page_index.get(page_name)
+            message = entry["message"] if entry else None
+        else:
+            params = {"title": page_name, "spaceKey": self.config["space"], "expand": "version"}
+            r = self.scheduler.request("GET", self.config["host_url"], params=params)
+            r.raise_for_status()
+            response_json = r.json()
+            message = response_json["results"][0]["version"].get("message") if response_json["results"] else None
+        match = VERSION_HASH_REGEX.search(message or "")
+        return match.group(1) if match else None
+
+    @timed("find_parent_name_of_page")
     def find_parent_name_of_page(self, name):
-        if self.config["debug"]:
-            print(f"INFO    -   * Mkdocs With Confluence: Find PARENT OF PAGE, PAGE NAME: {name}")
+        log.debug("  * Mkdocs With Confluence: Find PARENT OF PAGE, PAGE NAME: %s", name)
+        if self.page_index is not None:
+            entry = self.page_index.get(name)
+            return entry["parent"] if entry else None
         idp = self.find_page_id(name)
         url = self.config["host_url"] + "/" + idp + "?expand=ancestors"
 
-        r = self.session.get(url)
+        r = self.scheduler.request("GET", url)
         r.raise_for_status()
-        with nostdout():
-            response_json = r.json()
+        response_json = r.json()
         if response_json:
-            if self.config["debug"]:
-                print(f"PARENT NAME: {response_json['ancestors'][-1]['title']}")
+            log.debug("PARENT NAME: %s", response_json["ancestors"][-1]["title"])
             return response_json["ancestors"][-1]["title"]
         else:
-            if self.config["debug"]:
-                print("PAGE DOES NOT HAVE PARENT")
+            log.debug("PAGE DOES NOT HAVE PARENT")
             return None
 
-    def wait_until(self, condition, interval=0.1, timeout=1):
-        start = time.time()
-        while not condition and time.time() - start < timeout:
-            time.sleep(interval)
+    @timed("build_page_index")
+    def build_page_index(self):
+        from requests.exceptions import RequestException
+
+        log.debug("  * Mkdocs With Confluence: Build PAGE INDEX of SPACE: %s", self.config["space"])
+        self.page_index = None
+        self.page_titles = {}
+        self.created_pages = {}
+        index = {}
+        params = {"spaceKey": self.config["space"], "type": "page", "expand": "version,ancestors", "limit": 200}
+        start = 0
+        try:
+            while True:
+                params["start"] = start
+                r = self.scheduler.request("GET", self.config["host_url"], params=params)
+                r.raise_for_status()
+                response_json = r.json()
+                for result in response_json["results"]:
+                    index[result["title"]] = self.__index_entry(result)
+                    self.page_titles[result["id"]] = result["title"]
+                if not response_json["results"] or "next" not in response_json.get("_links", {}):
+                    break
+                start += len(response_json["results"])
+        except RequestException as e:
+            log.warning("Mkdocs With Confluence: Cannot build page index (%s), falling back to lookups per page", e)
+            return
+        self.page_index = index
+        log.debug("PAGE INDEX: %d pages", len(index))
+        if self.state is not None:
+            self.state.replace_index(index)
+            self.state.set_meta("builds_since_verify", 0)
+
+    def index_page(self, response_json, parent_page_id=None):
+        if self.page_index is None:
+            return
+        entry = self.__index_entry(response_json)
+        if entry["parent"] is None and parent_page_id is not None:
+            entry["parent_id"] = parent_page_id
+            entry["parent"] = self.page_titles.get(parent_page_id)
+        with self.index_lock:
+            old_entry = self.page_index.get(entry["title"])
+            if old_entry is not None and not response_json.get("ancestors"):
+                entry["parent"], entry["parent_id"] = old_entry["parent"], old_entry["parent_id"]
+            self.page_index[entry["title"]] = entry
+            self.page_titles[entry["id"]] = entry["title"]
+        if self.state is not None and not self.dryrun:
+            self.state.save_index_entry(entry, ours=True)
+
+    def __index_entry(self, result):
+        ancestors = result.get("ancestors") or []
+        version = result.get("version") or {}
+        return {
+            "id": result["id"],
+            "title": result["title"],
+            "version": version.get("number"),
+            "message": version.get("message", ""),
+            "parent": ancestors[-1]["title"] if ancestors else None,
+            "parent_id": ancestors[-1]["id"] if ancestors else None,
+        }
@@ -0,0 +1,27 @@
+import threading
+import time
+
+
+class ProgressReporter:
+    # Logs a fixed width progress bar at most once every `interval` seconds, and always for the last item,
+    # so the cost of reporting does not grow with the number of pages
+    def __init__(self, log, label, total, interval=2.0, width=40):
+        self.log = log
+        self.label = label
+        self.total = max(1, total)
+        self.interval = interval
+        self.width = width
+        self.done = 0
+        self.last = None
+        self.lock = threading.Lock()
+
+    def advance(self, n=1):
+        with self.lock:
+            self.done += n
+            now = time.monotonic()
+            if self.done < self.total and self.last is not None and now - self.last < self.interval:
+                return
+            self.last = now
+            done = min(self.done, self.total)
+        filled = self.width * done // self.total
+        self.log.info("%s: [%s%s] (%d / %d)", self.label, "#" * filled, "-" * (self.width - filled), done, self.total)
@@ -0,0 +1,34 @@
+import hashlib
+
+from mkdocs_with_confluence.disk_store import DiskStore
+
+
+def package_version(name):
+    try:
+        from importlib.metadata import version
+    except ImportError:  # Python < 3.8
+        from pkg_resources import get_distribution
+
+        def version(name):
+            return get_distribution(name).version
+
+    try:
+        return version(name)
+    except Exception:
+        return "unknown"
+
+
+class RenderCache:
+    # Content-addressed storage bodies on disk, evicted least recently used first once over max_bytes
+    def __init__(self, directory, max_bytes, salt=""):
+        self.store = DiskStore(directory, max_bytes, ".html")
+        self.salt = salt
+
+    def key(self, markdown):
+        return hashlib.sha256((self.salt + "\0" + markdown).encode("utf-8")).hexdigest()
+
+    def get(self, markdown):
+        return self.store.get(self.key(markdown))
+
+    def put(self, markdown, body):
+        self.store.put(self.key(markdown), body)
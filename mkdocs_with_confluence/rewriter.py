@@ -0,0 +1,53 @@
+import html
+import posixpath
+import re
+from urllib.parse import unquote
+
+# One pass over the page for both kinds of images: files exported as <img src="file://...">, and markdown images,
+# whose source is either bare or in angle brackets (which allows spaces)
+IMAGE_REGEX = re.compile(r'<img src="file://([^"]+)"[^>]*>|!\[[^\]]*\]\(\s*(?:<([^>\n]+)>|([^\s)>]+))')
+# Markdown image sources that are not files of the site: URLs, absolute paths and anchors
+EXTERNAL_SOURCE_REGEX = re.compile(r"[a-zA-Z][a-zA-Z0-9+.-]*:|/|#")
+
+
+def file_image(src):
+    path = unquote(src)
+    filename = html.escape(path.rpartition("/")[2])
+    return path, f'<p><ac:image ac:height="350"><ri:attachment ri:filename="{filename}"/></ac:image></p>'
+
+
+def docs_path(page_dir, src):
+    path = posixpath.normpath(posixpath.join(page_dir, unquote(src)))
+    while path.startswith("../"):
+        path = path[3:]
+    return path
+
+
+def rewrite_images(markdown, page_dir=""):
+    # Returns the markdown with file:// images replaced by ac:image markup, and the attachments of the page:
+    # absolute paths for file:// images, docs_dir relative paths for markdown images. Markdown images are
+    # left in place, md2cf renders them as ac:image attachments and mistune would escape inline ac: tags.
+    if '<img src="file://' not in markdown and "![" not in markdown:
+        return markdown, []
+    # Keyed by the source as written, so an image used several times on the page is resolved once
+    file_images = {}
+    markdown_images = set()
+    attachments = {}
+
+    def replace(match):
+        group = match.lastindex
+        src = match.group(group)
+        if group == 1:
+            image = file_images.get(src)
+            if image is None:
+                path, image = file_image(src)
+                file_images[src] = image
+                attachments[path] = None
+            return image
+        if src not in markdown_images:
+            markdown_images.add(src)
+            if not EXTERNAL_SOURCE_REGEX.match(src):
+                attachments[docs_path(page_dir, src)] = None
+        return match.group(0)
+
+    return IMAGE_REGEX.sub(replace, markdown), list(attachments)
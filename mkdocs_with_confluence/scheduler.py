@@ -0,0 +1,147 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Sent again after a timeout or a 5xx; a write may have been applied already (a page created, a version bumped), so
+# writes are only sent again when it certainly was not: a 429, or no connection at all
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def connect_error(e):
+    # The request never reached the server
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    reason = e.args[0] if e.args else None
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+class AdaptiveLimiter:
+    # Concurrency limit that halves on throttling and grows back slowly (AIMD)
+    def __init__(self, max_limit):
+        self.max_limit = max(1, max_limit)
+        self.limit = float(self.max_limit)
+        self.active = 0
+        self.resume_at = 0.0
+        self.cond = threading.Condition()
+
+    def acquire(self):
+        with self.cond:
+            while True:
+                pause = self.resume_at - time.monotonic()
+                if pause > 0:
+                    self.cond.wait(pause)
+                elif self.active >= int(self.limit):
+                    self.cond.wait()
+                else:
+                    break
+            self.active += 1
+
+    def release(self, throttled=False, retry_after=None):
+        with self.cond:
+            self.active -= 1
+            if throttled:
+                self.limit = max(1.0, self.limit / 2)
+                if retry_after:
+                    self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self.cond.notify_all()
+
+
+class RequestScheduler:
+    # Sends every Confluence request, retrying 429/5xx after Retry-After or a jittered exponential backoff
+    def __init__(
+        self, session, max_concurrency=4, max_retries=5, backoff=0.5, max_backoff=60, metrics=None, timeout=None
+    ):
+        self.session = session
+        self.metrics = metrics
+        self.timeout = timeout
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def request(self, method, url, **kwargs):
+        # A request without a timeout could stall the whole build
+        if self.timeout is not None:
+            kwargs.setdefault("timeout", self.timeout)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            self.rewind(kwargs)
+            self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                r = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.limiter.release(throttled=True)
+                self.record(method, url, None, start)
+                if attempt >= self.max_retries or not (idempotent or connect_error(e)):
+                    raise
+            else:
+                throttled = r.status_code in RETRY_STATUS_CODES
+                retry_after = self.retry_after(r) if throttled else None
+                self.limiter.release(throttled=throttled, retry_after=retry_after)
+                self.record(method, url, r, start)
+                retry = r.status_code == 429 or (throttled and idempotent)
+                if not retry or attempt >= self.max_retries:
+                    return r
+                if retry_after is not None:
+                    attempt += 1
+                    self.count_retry()
+                    continue
+            time.sleep(self.delay(attempt))
+            attempt += 1
+            self.count_retry()
+
+    def record(self, method, url, r, start):
+        if self.metrics is None or getattr(r, "from_cache", False):
+            # Answered by the HTTP cache, nothing was sent
+            return
+        seconds = time.perf_counter() - start
+        if r is None:
+            self.metrics.add_request(method, url, "error", seconds, 0, 0)
+            return
+        body = r.request.body
+        sent = len(body) if body is not None and hasattr(body, "__len__") else 0
+        if getattr(r, "revalidated", False):
+            # A 304 on the wire, the body came from the HTTP cache
+            self.metrics.add_request(method, r.request.url, 304, seconds, sent, 0)
+            return
+        self.metrics.add_request(method, r.request.url, r.status_code, seconds, sent, len(r.content))
+
+    def count_retry(self):
+        if self.metrics is not None:
+            self.metrics.count("http.retries")
+
+    def delay(self, attempt):
+        # "Full jitter": a random delay up to the exponential cap
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def retry_after(self, r):
+        value = r.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return min(self.max_backoff, max(0.0, float(value)))
+        except ValueError:
+            pass
+        try:
+            return min(self.max_backoff, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            return None
+
+    def rewind(self, kwargs):
+        # File bodies are consumed by a previous attempt and must be re-read on retry
+        files = kwargs.get("files") or {}
+        for value in files.values() if isinstance(files, dict) else (value for key, value in files):
+            if isinstance(value, tuple) and hasattr(value[1], "seek"):
+                value[1].seek(0)
+        if hasattr(kwargs.get("data"), "seek"):
+            kwargs["data"].seek(0)
@@ -0,0 +1,101 @@
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    title TEXT PRIMARY KEY,
+    page_id TEXT NOT NULL,
+    version INTEGER,
+    message TEXT,
+    parent TEXT,
+    parent_id TEXT,
+    src_path TEXT,
+    source_key TEXT,
+    attachments TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SyncState:
+    # Local copy of the page index plus what was last published from each source page
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def get_meta(self, key, default=None):
+        with self.lock:
+            row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def get_page(self, title):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM pages WHERE title = ?", (title,)).fetchone()
+        return self.__page(row) if row else None
+
+    def pages(self):
+        with self.lock:
+            rows = self.db.execute("SELECT * FROM pages").fetchall()
+        return [self.__page(row) for row in rows]
+
+    def save_index_entry(self, entry, ours=False):
+        # Local columns survive our own writes, but not a remote change we did not make (drift)
+        with self.lock:
+            row = self.db.execute("SELECT * FROM pages WHERE title = ?", (entry["title"],)).fetchone()
+            keep = row is not None and row["page_id"] == entry["id"] and (ours or row["version"] == entry["version"])
+            self.db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry["title"],
+                    entry["id"],
+                    entry["version"],
+                    entry["message"],
+                    entry["parent"],
+                    entry["parent_id"],
+                    row["src_path"] if row is not None else None,
+                    row["source_key"] if keep else None,
+                    row["attachments"] if keep else None,
+                ),
+            )
+
+    def replace_index(self, index):
+        for entry in index.values():
+            self.save_index_entry(entry)
+        with self.lock:
+            titles = list(index)
+            self.db.execute("CREATE TEMP TABLE IF NOT EXISTS live (title TEXT PRIMARY KEY)")
+            self.db.execute("DELETE FROM live")
+            self.db.executemany("INSERT INTO live VALUES (?)", [(title,) for title in titles])
+            self.db.execute("DELETE FROM pages WHERE title NOT IN (SELECT title FROM live)")
+
+    def save_source(self, title, src_path, source_key, attachments):
+        with self.lock:
+            self.db.execute(
+                "UPDATE pages SET src_path = ?, source_key = ?, attachments = ? WHERE title = ?",
+                (src_path, source_key, json.dumps(attachments), title),
+            )
+
+    def commit(self):
+        with self.lock:
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+    def __page(self, row):
+        page = dict(row)
+        page["attachments"] = json.loads(page["attachments"]) if page["attachments"] else {}
+        return page
@@ -0,0 +1,88 @@
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.exceptions import NewConnectionError
+
+log = logging.getLogger("mkdocs.plugins.mkdocs_with_confluence")
+
+ACCEPT_ENCODING = "gzip, deflate"
+
+
+def build_session(auth, pool_connections=4, pool_maxsize=32, http2=False):
+    # One session for every request of the plugin: pooled keep-alive connections, compressed responses, and
+    # the credentials set once
+    if http2:
+        try:
+            session = Http2Session(auth, pool_maxsize)
+        except ImportError:
+            log.warning("Mkdocs With Confluence: http2 needs 'httpx[http2]' installed, using HTTP/1.1")
+        else:
+            return session
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    session.auth = auth
+    return session
+
+
+class Http2Session:
+    # The part of requests.Session the plugin uses, on top of an httpx client speaking HTTP/2. Responses and
+    # errors are translated to their requests counterparts, so the rest of the plugin cannot tell the difference.
+    def __init__(self, auth, pool_maxsize):
+        import httpx
+
+        self.httpx = httpx
+        self.client = httpx.Client(
+            http2=True,
+            auth=auth,
+            headers={"Accept-Encoding": ACCEPT_ENCODING},
+            limits=httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize),
+        )
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, timeout=None):
+        httpx = self.httpx
+        headers = dict(headers or {})
+        content = None
+        if data is not None:
+            if hasattr(data, "__len__"):
+                headers.setdefault("Content-Length", str(len(data)))
+            content = data if isinstance(data, (bytes, str)) else iter(data)
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        try:
+            r = self.client.request(
+                method, url, params=params, content=content, json=json, headers=headers, timeout=timeout
+            )
+        except httpx.ConnectTimeout as e:
+            raise requests.exceptions.ConnectTimeout(str(e))
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(str(e))
+        except httpx.ConnectError as e:
+            # Told apart from errors after the request was sent, which a write must not be retried on
+            raise requests.exceptions.ConnectionError(NewConnectionError(None, str(e)))
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(str(e))
+        return self.response(r, data)
+
+    def response(self, r, data):
+        response = requests.Response()
+        response.status_code = r.status_code
+        response.headers = CaseInsensitiveDict(r.headers)
+        response.url = str(r.url)
+        response.reason = r.reason_phrase
+        response._content = r.content
+        response.encoding = r.encoding
+        request = requests.PreparedRequest()
+        request.method = r.request.method
+        request.url = str(r.request.url)
+        request.headers = CaseInsensitiveDict(r.request.headers)
+        request.body = data if data is not None else r.request.content
+        response.request = request
+        return response
+
+    def close(self):
+        self.client.close()
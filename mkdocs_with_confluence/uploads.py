@@ -0,0 +1,119 @@
+import contextlib
+import mimetypes
+import os
+import threading
+import uuid
+
+
+class MultipartStream:
+    # multipart/form-data body read from disk piece by piece, so files are never held in memory
+    def __init__(self):
+        self.boundary = uuid.uuid4().hex
+        self.parts = []
+        self.position = 0
+        self.index = 0
+        self.offset = 0
+        self.handle = None
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def add_field(self, name, value):
+        header = f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+        self.parts.append(header.encode("utf-8") + value.encode("utf-8") + b"\r\n")
+
+    def add_file(self, name, filepath):
+        filename = os.path.basename(filepath)
+        content_type, encoding = mimetypes.guess_type(filepath)
+        if content_type is None:
+            content_type = "multipart/form-data"
+        header = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        )
+        self.parts.append(header.encode("utf-8"))
+        self.parts.append(filepath)
+        self.parts.append(b"\r\n")
+
+    def __len__(self):
+        size = len(f"--{self.boundary}--\r\n")
+        for part in self.parts:
+            size += len(part) if isinstance(part, bytes) else os.path.getsize(part)
+        return size
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position):
+        if position != 0:
+            raise ValueError("MultipartStream can only be rewound to the start")
+        self.close()
+        self.position = self.index = self.offset = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self)
+        chunks = []
+        while size > 0 and self.index <= len(self.parts):
+            if self.index == len(self.parts):
+                part = f"--{self.boundary}--\r\n".encode("utf-8")
+            else:
+                part = self.parts[self.index]
+            if isinstance(part, bytes):
+                chunk = part[self.offset : self.offset + size]
+                self.offset += len(chunk)
+                if self.offset >= len(part):
+                    self.index, self.offset = self.index + 1, 0
+            else:
+                if self.handle is None:
+                    self.handle = open(part, "rb")
+                chunk = self.handle.read(size)
+                if len(chunk) < size:
+                    self.handle.close()
+                    self.handle = None
+                    self.index += 1
+            chunks.append(chunk)
+            size -= len(chunk)
+            self.position += len(chunk)
+        return b"".join(chunks)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(1024 * 1024)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ByteBudget:
+    # Caps the bytes of all uploads in flight; a single oversized upload may still run on its own
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def reserve(self, size):
+        with self.cond:
+            while self.in_flight and self.in_flight + size > self.limit:
+                self.cond.wait()
+            self.in_flight += size
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.in_flight -= size
+                self.cond.notify_all()
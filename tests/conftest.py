@@ -0,0 +1,78 @@
+import logging
+import os
+import sys
+
+import pytest
+from mkdocs.commands.build import build
+from mkdocs.config import load_config
+from mkdocs.config.defaults import MkDocsConfig
+
+# The mock Confluence and the site generator of the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from mock_confluence import MockConfluence  # noqa: E402
+from sitegen import generate_site  # noqa: E402
+
+ENABLE_ENV = "MKDOCS_WITH_CONFLUENCE_TEST"
+
+
+@pytest.fixture
+def mock():
+    with MockConfluence(etags=False) as mock:
+        mock.add_page("Root")
+        yield mock
+
+
+@pytest.fixture
+def site(tmp_path, mock, monkeypatch):
+    # Writes a synthetic site publishing to the mock below "Root", returns its config file
+    monkeypatch.setenv(ENABLE_ENV, "1")
+
+    def site(pages=8, depth=3, images_per_page=2, unique_images=4, **options):
+        plugin_config = {
+            "host_url": mock.url,
+            "space": "TEST",
+            "parent_page_name": "Root",
+            "username": "test",
+            "password": "test",
+            "enabled_if_env": ENABLE_ENV,
+            "request_retries": 0,
+        }
+        plugin_config.update(options)
+        return generate_site(
+            str(tmp_path / "site"),
+            pages=pages,
+            depth=depth,
+            images_per_page=images_per_page,
+            unique_images=unique_images,
+            page_size=256,
+            plugin_config=plugin_config,
+        )
+
+    return site
+
+
+@pytest.fixture
+def publish():
+    # Runs `mkdocs build` on a config file, returns the plugin instance
+    logging.getLogger("mkdocs").setLevel(logging.ERROR)
+
+    def publish(config_file):
+        # Like a `mkdocs build` process of its own: MkDocs would otherwise reuse the plugin of the previous build
+        MkDocsConfig.plugins.plugin_cache.clear()
+        config = load_config(config_file)
+        config.plugins.on_startup(command="build", dirty=False)
+        try:
+            build(config)
+        finally:
+            config.plugins.on_shutdown()
+        return config.plugins["mkdocs-with-confluence"]
+
+    return publish
+
+
+def titles(mock):
+    # Title of every page on the mock, with the title of its parent
+    return {
+        page["title"]: mock.pages[page["parent"]]["title"] if page["parent"] else None for page in mock.pages.values()
+    }
@@ -0,0 +1,59 @@
+import pytest
+from mkdocs.exceptions import Abort
+
+# With 8 pages drawing 2 images each from 4, most pages upload their images in one multipart batch
+
+
+def page_attachments(mock):
+    return {
+        page["title"]: sorted(mock.attachments.get(page_id, {}))
+        for page_id, page in mock.pages.items()
+        if mock.attachments.get(page_id)
+    }
+
+
+def test_batch_results_are_mapped_back_to_files(mock, site, publish):
+    plugin = publish(site(deferred_publish=True))
+    expected = {
+        title: sorted({path.rsplit("/", 1)[-1] for path in attachments})
+        for title, attachments in plugin.page_attachments.items()
+    }
+    assert page_attachments(mock) == expected
+    assert mock.requests["POST /rest/api/content/{id}/child/attachment"] == len(expected)
+    for attachments in mock.attachments.values():
+        for attachment in attachments.values():
+            assert attachment["version"]["message"].startswith("MKDocsWithConfluence [v")
+
+
+@pytest.mark.parametrize("batch_files", [1, 10])
+def test_failed_file_is_uploaded_by_the_next_incremental_build(mock, site, publish, caplog, batch_files):
+    config_file = site(deferred_publish=True, incremental=True, attachment_batch_files=batch_files)
+    mock.failures[("POST", "image-0001.png")] = 500
+    with pytest.raises(Abort):
+        publish(config_file)
+    assert "pages could not be published" in caplog.text
+    missing = [title for title, files in page_attachments(mock).items() if "image-0001.png" not in files]
+    del mock.failures[("POST", "image-0001.png")]
+
+    plugin = publish(config_file)
+    using = {title for title, paths in plugin.page_attachments.items() if any("image-0001" in p for p in paths)}
+    assert using
+    for title, files in page_attachments(mock).items():
+        assert ("image-0001.png" in files) == (title in using)
+    assert missing
+
+
+def test_file_missing_from_the_batch_response_fails_its_page(mock, site, publish, monkeypatch, caplog):
+    upload_attachments = mock.upload_attachments
+
+    def forgetful(*args):
+        status, result = upload_attachments(*args)
+        if status == 200 and "results" in result:
+            result = dict(result, results=[r for r in result["results"] if r["title"] != "image-0001.png"])
+        return status, result
+
+    monkeypatch.setattr(mock, "upload_attachments", forgetful)
+    with pytest.raises(Abort):
+        publish(site(deferred_publish=True))
+    assert "missing from the upload response" in caplog.text
+    assert "pages could not be published" in caplog.text
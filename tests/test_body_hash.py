@@ -0,0 +1,39 @@
+import hashlib
+
+
+def versions(mock):
+    return {page["title"]: page["version"] for page in mock.pages.values()}
+
+
+def test_pages_carry_the_hash_of_their_body(mock, site, publish):
+    publish(site())
+    for page in mock.pages.values():
+        if page["title"] != "Root":
+            sha1 = hashlib.sha1(page["body"].encode("utf-8")).hexdigest()
+            assert page["message"] == f"MKDocsWithConfluence [v{sha1}]"
+
+
+def test_unchanged_bodies_are_not_updated(mock, site, publish):
+    config_file = site(metrics=True)
+    publish(config_file)
+    before = versions(mock)
+    mock.reset_counters()
+    plugin = publish(config_file)
+    assert mock.requests["PUT /rest/api/content/{id}"] == 0
+    assert plugin.metrics.counters["pages.body_unchanged"] == 8
+    assert versions(mock) == before
+
+
+def test_changed_body_is_updated_with_its_new_hash(mock, site, publish, tmp_path):
+    config_file = site()
+    publish(config_file)
+    page = tmp_path / "site" / "docs" / "section-1" / "section-2" / "page-00002.md"
+    page.write_text(page.read_text(encoding="utf-8") + "\n\nAn edit\n", encoding="utf-8")
+    mock.reset_counters()
+    publish(config_file)
+    assert mock.requests["PUT /rest/api/content/{id}"] == 1
+    updated = next(page for page in mock.pages.values() if page["title"] == "Page 00002")
+    assert updated["version"] == 2
+    assert "An edit" in updated["body"]
+    sha1 = hashlib.sha1(updated["body"].encode("utf-8")).hexdigest()
+    assert updated["message"] == f"MKDocsWithConfluence [v{sha1}]"
@@ -0,0 +1,16 @@
+from conftest import ENABLE_ENV
+
+
+def test_without_enabled_if_env_nothing_is_published(mock, site, publish):
+    plugin = publish(site(enabled_if_env=None))
+    assert not plugin.enabled
+    assert sum(mock.requests.values()) == 0
+
+
+def test_unset_variable_disables_the_plugin(mock, site, publish, monkeypatch):
+    config_file = site()
+    monkeypatch.delenv(ENABLE_ENV)
+    plugin = publish(config_file)
+    assert not plugin.enabled
+    assert plugin.session is None
+    assert sum(mock.requests.values()) == 0
@@ -0,0 +1,44 @@
+import os
+import time
+
+from mkdocs_with_confluence.disk_store import DiskStore
+from mkdocs_with_confluence.render_cache import RenderCache
+
+
+def test_put_get_delete(tmp_path):
+    store = DiskStore(str(tmp_path), 1024 * 1024, ".json")
+    assert store.get("ab12") is None
+    store.put("ab12", "{}")
+    assert store.get("ab12") == "{}"
+    assert os.path.exists(tmp_path / "ab" / "ab12.json")
+    store.delete("ab12")
+    assert store.get("ab12") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    store = DiskStore(str(tmp_path), 1000, ".html")
+    for i, key in enumerate(("aa", "bb", "cc")):
+        store.put(key, "x" * 300)
+        os.utime(store.path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    # Reading "aa" makes "bb" the least recently used entry
+    assert store.get("aa") is not None
+    store.put("dd", "x" * 300)
+    assert store.get("bb") is None
+    assert store.get("aa") is not None
+    assert store.size <= 800
+
+
+def test_replacing_an_entry_does_not_count_it_twice(tmp_path):
+    store = DiskStore(str(tmp_path), 1000, ".html")
+    store.put("aa", "x" * 100)
+    for _ in range(20):
+        store.put("aa", "x" * 100)
+    assert store.size == 100
+    assert store.get("aa") == "x" * 100
+
+
+def test_render_cache_keys_depend_on_the_salt(tmp_path):
+    cache = RenderCache(str(tmp_path), 1024 * 1024, "md2cf=1")
+    cache.put("# Title", "<h1>Title</h1>")
+    assert cache.get("# Title") == "<h1>Title</h1>"
+    assert RenderCache(str(tmp_path), 1024 * 1024, "md2cf=2").get("# Title") is None
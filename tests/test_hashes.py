@@ -0,0 +1,77 @@
+import hashlib
+import os
+import threading
+
+from mkdocs_with_confluence import hashes
+from mkdocs_with_confluence.hashes import HashService
+
+
+def make_files(tmp_path, count=5):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"image-{i}.png"
+        path.write_bytes(os.urandom(1000 + i))
+        paths.append(str(path))
+    return paths
+
+
+def counting(monkeypatch):
+    calls = []
+    file_sha1 = hashes.file_sha1
+
+    def counted(path):
+        calls.append(path)
+        return file_sha1(path)
+
+    monkeypatch.setattr(hashes, "file_sha1", counted)
+    return calls
+
+
+def test_hashes_match_hashlib(tmp_path):
+    service = HashService()
+    for path in make_files(tmp_path):
+        with open(path, "rb") as f:
+            assert service.sha1(path) == hashlib.sha1(f.read()).hexdigest()
+
+
+def test_a_file_is_hashed_once_however_it_is_asked_for(tmp_path, monkeypatch):
+    calls = counting(monkeypatch)
+    paths = make_files(tmp_path)
+    service = HashService(workers=4)
+
+    def ask():
+        for _ in range(20):
+            service.prefetch(paths)
+            for path in paths:
+                service.sha1(path)
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(calls) == sorted(paths)
+
+
+def test_a_changed_file_is_hashed_again(tmp_path, monkeypatch):
+    calls = counting(monkeypatch)
+    path = make_files(tmp_path, 1)[0]
+    service = HashService()
+    first = service.sha1(path)
+    with open(path, "ab") as f:
+        f.write(b"more")
+    assert service.sha1(path) != first
+    assert len(calls) == 2
+
+
+def test_hashes_are_kept_from_one_build_to_the_next(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / "cache" / "hashes.json")
+    paths = make_files(tmp_path)
+    service = HashService(cache_file=cache_file)
+    expected = [service.sha1(path) for path in paths]
+    service.save()
+
+    calls = counting(monkeypatch)
+    service = HashService(cache_file=cache_file)
+    assert [service.sha1(path) for path in paths] == expected
+    assert calls == []
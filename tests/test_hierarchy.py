@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from mkdocs_with_confluence.plugin import MkdocsWithConfluence
+
+
+def test_sections_are_created_level_by_level_once_each():
+    plugin = MkdocsWithConfluence()
+    ids = {"Root": "1"}
+    calls = []
+    plugin.find_page_id = ids.get
+
+    def add_section(section_name, parent_name):
+        calls.append((section_name, parent_name))
+        ids[section_name] = str(len(ids) + 1)
+        return True
+
+    plugin.add_section = add_section
+    chains = [["Root", "A", "B"], ["Root", "A", "C"], ["Root", "A", "B"], ["Root", "D"], ["Root"]]
+    assert plugin.materialize_hierarchy(chains) == set()
+    assert calls == [("A", "Root"), ("D", "Root"), ("B", "A"), ("C", "A")]
+
+
+def test_sections_below_a_failed_section_are_not_attempted():
+    plugin = MkdocsWithConfluence()
+    ids = {"Root": "1"}
+    calls = []
+    plugin.find_page_id = ids.get
+
+    def add_section(section_name, parent_name):
+        calls.append(section_name)
+        if section_name == "A":
+            return False
+        ids[section_name] = str(len(ids) + 1)
+        return True
+
+    plugin.add_section = add_section
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        failed = plugin.materialize_hierarchy([["Root", "A", "B", "C"], ["Root", "D", "E"]], executor)
+    assert failed == {"A", "B", "C"}
+    assert calls == ["A", "D", "E"]
+
+
+def test_sections_are_created_before_their_pages(mock, site, publish):
+    publish(site(deferred_publish=True, publish_workers=4))
+    pages = {page["title"]: page for page in mock.pages.values()}
+    # Every section and page is created once, the ids of new sections come from their create response
+    assert mock.requests["POST /rest/api/content"] == 3 + 8
+    assert mock.requests["GET /rest/api/content?title"] == 0
+    assert mock.requests["GET /rest/api/content/{id}"] == 0
+    assert int(pages["Section 1"]["id"]) < int(pages["Section 2"]["id"]) < int(pages["Section 3"]["id"])
+    assert pages["Section 3"]["parent"] == pages["Section 2"]["id"]
+    assert pages["Page 00003"]["parent"] == pages["Section 3"]["id"]
@@ -0,0 +1,86 @@
+import requests
+
+from mkdocs_with_confluence.http_cache import HttpCache
+
+API = "http://confluence/rest/api/content"
+
+
+class FakeSession:
+    # Serves GETs with an ETag per URL and answers 304 when the client already has it
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        self.requests.append((method, url, dict(headers or {})))
+        r = requests.Response()
+        r.url = url
+        r.encoding = "utf-8"
+        r.request = requests.Request(method, url).prepare()
+        if method != "GET":
+            r.status_code = 200
+            r._content = b"{}"
+        elif (headers or {}).get("If-None-Match") == f'"{url}"':
+            r.status_code = 304
+            r._content = b""
+        else:
+            r.status_code = 200
+            r.headers["ETag"] = f'"{url}"'
+            r._content = f'{{"url": "{url}"}}'.encode()
+        return r
+
+    def close(self):
+        pass
+
+
+def make_cache(tmp_path, session):
+    return HttpCache(session, str(tmp_path / "http"), ttl=3600, max_bytes=1024 * 1024)
+
+
+def test_identical_gets_are_sent_once_per_build(tmp_path):
+    session = FakeSession()
+    cache = make_cache(tmp_path, session)
+    first = cache.request("GET", f"{API}/100/child/attachment")
+    second = cache.request("GET", f"{API}/100/child/attachment")
+    assert len(session.requests) == 1
+    assert second.json() == first.json()
+    assert second.from_cache
+
+
+def test_next_build_revalidates_from_disk(tmp_path):
+    session = FakeSession()
+    make_cache(tmp_path, session).request("GET", f"{API}/100/child/attachment")
+    r = make_cache(tmp_path, session).request("GET", f"{API}/100/child/attachment")
+    assert session.requests[-1][2]["If-None-Match"] == f'"{API}/100/child/attachment"'
+    assert r.status_code == 200
+    assert r.revalidated
+    assert r.json() == {"url": f"{API}/100/child/attachment"}
+
+
+def test_writes_invalidate_the_page_and_collection_queries(tmp_path):
+    session = FakeSession()
+    cache = make_cache(tmp_path, session)
+    for url in (f"{API}/100", f"{API}/100/child/attachment", f"{API}/200", API):
+        cache.request("GET", url)
+    cache.request("PUT", f"{API}/100")
+    for url in (f"{API}/100", f"{API}/100/child/attachment", f"{API}/200", API):
+        cache.request("GET", url)
+    refetched = [url for method, url, headers in session.requests[5:]]
+    assert refetched == [f"{API}/100", f"{API}/100/child/attachment", API]
+
+
+def test_invalidated_entries_are_not_revalidated_by_the_next_build(tmp_path):
+    session = FakeSession()
+    cache = make_cache(tmp_path, session)
+    cache.request("GET", f"{API}/100/child/attachment")
+    cache.request("POST", f"{API}/100/child/attachment")
+    make_cache(tmp_path, session).request("GET", f"{API}/100/child/attachment")
+    assert "If-None-Match" not in session.requests[-1][2]
+
+
+def test_reset_forgets_the_build_memo(tmp_path):
+    session = FakeSession()
+    cache = make_cache(tmp_path, session)
+    cache.request("GET", f"{API}/100")
+    cache.reset()
+    cache.request("GET", f"{API}/100")
+    assert len(session.requests) == 2
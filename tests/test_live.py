@@ -0,0 +1,143 @@
+import threading
+
+import pytest
+from mkdocs.commands.build import build
+from mkdocs.config import load_config
+from mkdocs.config.defaults import MkDocsConfig
+
+from mkdocs_with_confluence.live import LivePublisher
+
+
+class Recorder:
+    def __init__(self):
+        self.batches = []
+        self.published = threading.Event()
+
+    def __call__(self, batch):
+        self.batches.append(batch)
+        self.published.set()
+
+
+def test_rapid_rebuilds_are_published_in_one_batch():
+    recorder = Recorder()
+    live = LivePublisher(recorder, delay=0.2)
+    live.submit([{"title": "Intro", "body": "1"}])
+    live.submit([{"title": "Usage", "body": "1"}, {"title": "Intro", "body": "2"}])
+    assert recorder.published.wait(5)
+    live.close()
+    assert len(recorder.batches) == 1
+    assert sorted((item["title"], item["body"]) for item in recorder.batches[0]) == [("Intro", "2"), ("Usage", "1")]
+
+
+def test_nothing_is_published_before_the_delay():
+    recorder = Recorder()
+    live = LivePublisher(recorder, delay=60)
+    live.submit([{"title": "Intro"}])
+    assert not recorder.published.wait(0.1)
+    live.close()
+    assert recorder.batches == [[{"title": "Intro"}]]
+
+
+def test_close_without_pending_pages_publishes_nothing():
+    recorder = Recorder()
+    LivePublisher(recorder, delay=60).close()
+    assert recorder.batches == []
+
+
+def test_failed_pages_go_out_with_the_next_batch():
+    batches = []
+
+    def publish(batch):
+        batches.append(batch)
+        return [item for item in batch if item["title"] == "Intro"]
+
+    live = LivePublisher(publish, 60)
+    live.submit([{"title": "Intro", "body": "1"}, {"title": "Usage", "body": "1"}])
+    live.flush()
+    live.submit([{"title": "Usage", "body": "2"}])
+    live.close()
+    assert batches[1] == [{"title": "Intro", "body": "1"}, {"title": "Usage", "body": "2"}]
+
+
+def test_failed_pages_are_not_retried_once_replaced_or_discarded():
+    batches = []
+    live = LivePublisher(None, 60)
+
+    def publish(batch):
+        # Rebuilds come in while the batch is published
+        live.submit([{"title": "Intro", "body": "2"}])
+        live.discard("Usage")
+        batches.append(batch)
+        return batch
+
+    live.publish = publish
+    live.submit([{"title": "Intro", "body": "1"}, {"title": "Usage", "body": "1"}])
+    live.flush()
+    live.publish = lambda batch: batches.append(batch)
+    live.close()
+    assert batches[1] == [{"title": "Intro", "body": "2"}]
+
+
+@pytest.fixture
+def serve(site, tmp_path):
+    # A `mkdocs serve` session: the first build publishes everything, then every rebuild() reuses the plugin like
+    # the rebuilds of serve do. Live batches are only published by flush(), the debounce never fires.
+    MkDocsConfig.plugins.plugin_cache.clear()
+    config_file = site(live_debounce=3600)
+    config = load_config(config_file)
+    config.plugins.on_startup(command="serve", dirty=False)
+    plugin = config.plugins["mkdocs-with-confluence"]
+
+    def rebuild():
+        build(load_config(config_file))
+        return plugin
+
+    rebuild()
+    yield rebuild
+    config.plugins.on_shutdown()
+
+
+def edit(tmp_path, text):
+    page = tmp_path / "site" / "docs" / "section-1" / "page-00001.md"
+    page.write_text(page.read_text(encoding="utf-8") + f"\n\n{text}\n", encoding="utf-8")
+
+
+def published(mock, title):
+    return next(page for page in mock.pages.values() if page["title"] == title)
+
+
+def test_failed_live_page_is_retried_with_the_next_batch(mock, serve, tmp_path):
+    mock.failures[("PUT", "Page 00001")] = 500
+    edit(tmp_path, "First edit")
+    plugin = serve()
+    plugin.live.flush()
+    assert published(mock, "Page 00001")["version"] == 1
+
+    del mock.failures[("PUT", "Page 00001")]
+    plugin.live.flush()
+    page = published(mock, "Page 00001")
+    assert page["version"] == 2
+    assert "First edit" in page["body"]
+
+
+def test_failed_live_page_is_queued_again_by_the_next_rebuild(mock, serve, tmp_path):
+    mock.failures[("PUT", "Page 00001")] = 500
+    edit(tmp_path, "First edit")
+    serve().live.flush()
+
+    del mock.failures[("PUT", "Page 00001")]
+    plugin = serve()
+    assert list(plugin.live.pending) == ["Page 00001"]
+    plugin.live.flush()
+    assert published(mock, "Page 00001")["version"] == 2
+    # Published now, the next rebuild has nothing to send
+    serve()
+    assert plugin.live.pending == {}
+
+
+def test_live_attachments_are_uploaded_from_docs_dir(mock, serve, tmp_path):
+    edit(tmp_path, "First edit")
+    plugin = serve()
+    attachments = plugin.live.pending["Page 00001"]["attachments"]
+    assert attachments
+    assert all(str(path).startswith(str(tmp_path / "site" / "docs")) for path in attachments)
@@ -0,0 +1,37 @@
+import yaml
+
+
+def test_nav_is_walked_into_titles_ancestors_and_labels(site, publish):
+    plugin = publish(site())
+    assert plugin.nav_pages["index.md"] == {"title": "Home", "depth": 0, "ancestors": [], "label": "Home"}
+    assert plugin.nav_pages["section-1/section-2/page-00002.md"] == {
+        "title": "Page 00002",
+        "depth": 2,
+        "ancestors": ["Section 1", "Section 2"],
+        "label": "        Page 00002",
+    }
+    assert plugin.nav_pages["section-1/section-2/section-3/page-00003.md"]["ancestors"] == [
+        "Section 1",
+        "Section 2",
+        "Section 3",
+    ]
+    assert plugin.nav_label("Section 2") == "    Section 2"
+    assert plugin.nav_label("Page 00001") == "    Page 00001"
+    assert plugin.nav_label("Unknown") == "Unknown"
+
+
+def test_pages_without_a_nav_title_are_named_after_their_file(site, publish, tmp_path):
+    config_file = site()
+    with open(config_file, encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+    config["nav"][1]["Section 1"].append("section-1/extra-page.md")
+    with open(config_file, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    (tmp_path / "site" / "docs" / "section-1" / "extra-page.md").write_text("Some text\n", encoding="utf-8")
+    plugin = publish(config_file)
+    assert plugin.nav_pages["section-1/extra-page.md"] == {
+        "title": "extra-page",
+        "depth": 1,
+        "ancestors": ["Section 1"],
+        "label": "    extra-page",
+    }
@@ -0,0 +1,46 @@
+from conftest import titles
+
+
+def edit(tmp_path, text):
+    page = tmp_path / "site" / "docs" / "section-1" / "page-00001.md"
+    page.write_text(page.read_text(encoding="utf-8") + f"\n\n{text}\n", encoding="utf-8")
+
+
+def test_pages_are_looked_up_in_one_index_of_the_space(mock, site, publish):
+    publish(site())
+    assert mock.requests["GET /rest/api/content?spaceKey"] == 1
+    assert mock.requests["GET /rest/api/content?title"] == 0
+    assert mock.requests["GET /rest/api/content/{id}"] == 0
+    assert len(titles(mock)) == 1 + 1 + 3 + 7
+
+
+def test_updates_use_the_index_and_keep_it_current(mock, site, publish, tmp_path):
+    config_file = site()
+    publish(config_file)
+    edit(tmp_path, "An edit")
+    mock.reset_counters()
+    plugin = publish(config_file)
+    assert mock.requests["PUT /rest/api/content/{id}"] == 1
+    assert mock.requests["GET /rest/api/content?spaceKey"] == 1
+    assert mock.requests["GET /rest/api/content?title"] == 0
+    entry = plugin.page_index["Page 00001"]
+    assert entry["version"] == 2
+    assert entry["parent"] == "Section 1"
+    assert entry["message"] == f"MKDocsWithConfluence [v{plugin.find_page_hash('Page 00001')}]"
+    # Pages created by this build are in the index too, under their parent
+    assert plugin.page_index["Page 00002"]["parent"] == "Section 2"
+
+
+def test_lookups_per_page_when_the_index_cannot_be_built(mock, site, publish, monkeypatch):
+    list_pages = mock.list_pages
+
+    def unavailable(query):
+        if "spaceKey" in query and "title" not in query:
+            return 503, {"message": "unavailable"}
+        return list_pages(query)
+
+    monkeypatch.setattr(mock, "list_pages", unavailable)
+    plugin = publish(site())
+    assert plugin.page_index is None
+    assert mock.requests["GET /rest/api/content?title"] > 0
+    assert len(titles(mock)) == 1 + 1 + 3 + 7
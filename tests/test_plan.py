@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from mkdocs_with_confluence.plan import PublishPlan
+
+SNAPSHOT = {
+    "space": "DOCS",
+    "taken": 1700000000,
+    "pages": {
+        "Root": {"id": "1", "parent": None, "version": 1, "message": ""},
+        "Same": {"id": "2", "parent": "Root", "version": 3, "message": "MKDocsWithConfluence [v" + "a" * 40 + "]"},
+        "Changed": {
+            "id": "3",
+            "parent": "Root",
+            "version": 5,
+            "message": "MKDocsWithConfluence [v" + "b" * 40 + "]",
+            "attachments": {
+                "same.png": {"message": "MKDocsWithConfluence [v" + "c" * 40 + "]"},
+                "changed.png": {"message": "MKDocsWithConfluence [v" + "d" * 40 + "]"},
+            },
+        },
+        "Moved": {"id": "4", "parent": "Elsewhere", "version": 1, "message": ""},
+    },
+}
+
+
+@pytest.fixture
+def plan():
+    return PublishPlan(SNAPSHOT)
+
+
+def test_page_actions(plan):
+    assert plan.plan_page("New", "Root", "<p>new</p>", "e" * 40) == "create"
+    assert plan.plan_page("Same", "Root", "<p>same</p>", "a" * 40) == "noop"
+    assert plan.plan_page("Changed", "Root", "<p>changed</p>", "f" * 40) == "update"
+    assert plan.plan_page("Moved", "Root", "<p>moved</p>", "f" * 40) == "skip"
+    assert plan.pages["Changed"]["version"] == 5
+    assert plan.pages["Moved"]["reason"] == "parent on Confluence is 'Elsewhere'"
+
+
+def test_sections_are_only_created_when_missing(plan):
+    plan.plan_section("Root", None)
+    plan.plan_section("Section", "Root")
+    assert list(plan.pages) == ["Section"]
+    assert plan.pages["Section"]["action"] == "create"
+
+
+def test_attachment_actions(plan):
+    plan.plan_page("Changed", "Root", "<p>changed</p>", "f" * 40)
+    plan.plan_attachments(
+        "Changed",
+        [("img/same.png", "c" * 40, 10), ("img/changed.png", "0" * 40, 20), ("img/new.png", "1" * 40, 30)],
+    )
+    assert [(entry["file"], entry["action"]) for entry in plan.attachments] == [
+        ("same.png", "noop"),
+        ("changed.png", "update"),
+        ("new.png", "create"),
+    ]
+
+
+def test_attachments_of_skipped_pages_are_left_out(plan):
+    plan.plan_page("Moved", "Root", "<p>moved</p>", "f" * 40)
+    plan.plan_attachments("Moved", [("img/a.png", "1" * 40, 10)])
+    assert plan.attachments == []
+
+
+def test_summary_counts_only_what_would_be_sent(plan):
+    plan.plan_page("New", "Root", "<p>new</p>", "e" * 40)
+    plan.plan_page("Same", "Root", "<p>same</p>", "a" * 40)
+    plan.plan_page("Changed", "Root", "<p>changed</p>", "f" * 40)
+    plan.plan_attachments("Changed", [("same.png", "c" * 40, 10), ("changed.png", "0" * 40, 20)])
+    assert plan.summary() == {
+        "pages": {"create": 1, "noop": 1, "update": 1},
+        "attachments": {"noop": 1, "update": 1},
+        "page_bytes": len("<p>new</p>") + len("<p>changed</p>"),
+        "attachment_bytes": 20,
+    }
+
+
+def test_write(plan, tmp_path):
+    plan.plan_page("New", "Root", "<p>new</p>", "e" * 40)
+    path = tmp_path / "out" / "plan.json"
+    plan.write(str(path))
+    written = json.loads(path.read_text(encoding="utf-8"))
+    assert written["space"] == "DOCS"
+    assert written["snapshot_taken"] == 1700000000
+    assert [page["title"] for page in written["pages"]] == ["New"]
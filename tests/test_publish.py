@@ -0,0 +1,70 @@
+import pytest
+from mkdocs.exceptions import Abort
+
+from conftest import titles
+from mkdocs_with_confluence import hashes
+
+# With 8 pages: Home, pages 1, 4 and 7 in Section 1, 2 and 5 in Section 2, 3 and 6 in Section 3
+
+
+def test_pages_are_published_below_their_sections(mock, site, publish):
+    publish(site(deferred_publish=True))
+    published = titles(mock)
+    assert published["Home"] == "Root"
+    assert published["Section 1"] == "Root"
+    assert published["Section 2"] == "Section 1"
+    assert published["Section 3"] == "Section 2"
+    assert published["Page 00004"] == "Section 1"
+    assert published["Page 00005"] == "Section 2"
+    assert published["Page 00006"] == "Section 3"
+    assert len(published) == 1 + 1 + 3 + 7
+
+
+def test_failed_section_only_fails_the_pages_below_it(mock, site, publish, caplog):
+    mock.failures[("POST", "Section 2")] = 400
+    with pytest.raises(Abort):
+        publish(site(deferred_publish=True))
+    published = set(titles(mock))
+    assert {"Home", "Section 1", "Page 00001", "Page 00004", "Page 00007"} <= published
+    assert not {"Section 2", "Section 3", "Page 00002", "Page 00003", "Page 00005", "Page 00006"} & published
+    assert (
+        "6 pages could not be published: Section 2, Section 3, Page 00002, Page 00005, Page 00003, Page 00006"
+        in caplog.text
+    )
+
+
+def test_failed_page_does_not_stop_the_others(mock, site, publish, caplog):
+    mock.failures[("POST", "Page 00003")] = 500
+    with pytest.raises(Abort):
+        publish(site(deferred_publish=True))
+    assert "1 pages could not be published: Page 00003" in caplog.text
+    assert len(titles(mock)) == 1 + 1 + 3 + 6
+
+
+def test_unreadable_attachment_only_fails_its_pages(mock, site, publish, monkeypatch, caplog):
+    file_sha1 = hashes.file_sha1
+
+    def unreadable(path):
+        if path.endswith("image-0001.png"):
+            raise PermissionError(13, "Permission denied", path)
+        return file_sha1(path)
+
+    monkeypatch.setattr(hashes, "file_sha1", unreadable)
+    with pytest.raises(Abort):
+        publish(site(deferred_publish=True))
+    failed = [record for record in caplog.records if "*FAILED*: [Errno 13]" in record.getMessage()]
+    assert failed
+    assert f"{len(failed)} pages could not be published: " in caplog.text
+    # Every page was still published, and the attachments of the other pages uploaded
+    assert len(titles(mock)) == 1 + 1 + 3 + 7
+    assert len(mock.attachments) == 8 - len(failed)
+
+
+def test_failed_section_fails_the_build_without_deferred_publish(mock, site, publish, caplog):
+    mock.failures[("POST", "Section 3")] = 400
+    with pytest.raises(Abort):
+        publish(site())
+    published = set(titles(mock))
+    assert {"Home", "Section 2", "Page 00002", "Page 00005"} <= published
+    assert not {"Section 3", "Page 00003", "Page 00006"} & published
+    assert "3 pages could not be published: Section 3, Page 00003, Page 00006" in caplog.text
@@ -0,0 +1,43 @@
+from mkdocs_with_confluence.rewriter import rewrite_images
+
+
+def test_file_images_become_attachments():
+    markdown, attachments = rewrite_images('Before <img src="file:///tmp/my%20diagram.png" style="x"> after')
+    assert markdown == (
+        'Before <p><ac:image ac:height="350"><ri:attachment ri:filename="my diagram.png"/></ac:image></p> after'
+    )
+    assert attachments == ["/tmp/my diagram.png"]
+
+
+def test_markdown_images_are_resolved_against_the_page_directory():
+    source = '![a](img/a.png) ![b](../img/b.png "Title") ![c](./c.png)'
+    markdown, attachments = rewrite_images(source, "guide")
+    assert markdown == source
+    assert attachments == ["guide/img/a.png", "img/b.png", "guide/c.png"]
+
+
+def test_several_images_on_one_line_are_all_found():
+    markdown, attachments = rewrite_images("![a](a.png) text ![b](b.png)")
+    assert attachments == ["a.png", "b.png"]
+
+
+def test_angle_bracket_sources_may_contain_spaces():
+    markdown, attachments = rewrite_images('![a](<img/x y.png>) and ![b](<img/z.png> "Title")')
+    assert attachments == ["img/x y.png", "img/z.png"]
+
+
+def test_urls_absolute_paths_and_anchors_are_not_attachments():
+    source = "![a](https://example.com/a.png) ![b](data:image/png;base64,AAAA) ![c](/abs/c.png) ![d](#anchor)"
+    assert rewrite_images(source) == (source, [])
+
+
+def test_each_attachment_is_listed_once():
+    markdown, attachments = rewrite_images(
+        '![a](a.png) ![again](a.png) <img src="file:///tmp/d.png"> <img src="file:///tmp/d.png">'
+    )
+    assert attachments == ["a.png", "/tmp/d.png"]
+    assert markdown.count("ri:attachment") == 2
+
+
+def test_pages_without_images_are_returned_as_they_are():
+    assert rewrite_images("# Title\n\nNo images [here](page.md).") == ("# Title\n\nNo images [here](page.md).", [])
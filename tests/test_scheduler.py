@@ -0,0 +1,87 @@
+import pytest
+import requests
+
+from mkdocs_with_confluence import scheduler
+from mkdocs_with_confluence.scheduler import RequestScheduler
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    # Answers each request with the next outcome: a status code, a (status code, headers) pair or an exception
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.methods = []
+
+    def request(self, method, url, **kwargs):
+        self.methods.append(method)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        if isinstance(outcome, tuple):
+            return FakeResponse(*outcome)
+        return FakeResponse(outcome)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(scheduler.time, "sleep", slept.append)
+    return slept
+
+
+def test_retry_after_seconds_is_honoured_without_backoff(sleeps):
+    session = FakeSession((429, {"Retry-After": "0"}), 200)
+    r = RequestScheduler(session).request("POST", "http://confluence/rest/api/content")
+    assert r.status_code == 200
+    assert session.methods == ["POST", "POST"]
+    assert sleeps == []
+
+
+def test_retry_after_is_capped_and_parsed_from_dates():
+    requests_scheduler = RequestScheduler(FakeSession(), max_backoff=10)
+    assert requests_scheduler.retry_after(FakeResponse(429, {"Retry-After": "120"})) == 10
+    assert requests_scheduler.retry_after(FakeResponse(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0
+    assert requests_scheduler.retry_after(FakeResponse(429, {"Retry-After": "soon"})) is None
+    assert requests_scheduler.retry_after(FakeResponse(429)) is None
+
+
+def test_backoff_is_jittered_below_the_exponential_cap(sleeps):
+    session = FakeSession(503, 503, 503, 200)
+    r = RequestScheduler(session, backoff=1, max_backoff=3).request("GET", "http://confluence/rest/api/content")
+    assert r.status_code == 200
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= min(3, 2**attempt)
+
+
+def test_retries_stop_after_max_retries(sleeps):
+    session = FakeSession(500, 500, 500)
+    r = RequestScheduler(session, max_retries=2).request("GET", "http://confluence/rest/api/content")
+    assert r.status_code == 500
+    assert len(session.methods) == 3
+
+
+def test_writes_are_not_sent_again_after_a_server_error(sleeps):
+    session = FakeSession(500, 200)
+    r = RequestScheduler(session).request("PUT", "http://confluence/rest/api/content/1")
+    assert r.status_code == 500
+    assert session.methods == ["PUT"]
+
+
+def test_writes_are_not_sent_again_after_a_read_timeout(sleeps):
+    session = FakeSession(requests.exceptions.ReadTimeout(), 200)
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        RequestScheduler(session).request("POST", "http://confluence/rest/api/content")
+    assert session.methods == ["POST"]
+
+
+def test_writes_are_sent_again_when_the_connection_failed(sleeps):
+    session = FakeSession(requests.exceptions.ConnectTimeout(), 200)
+    r = RequestScheduler(session).request("POST", "http://confluence/rest/api/content")
+    assert r.status_code == 200
+    assert session.methods == ["POST", "POST"]
@@ -0,0 +1,46 @@
+import os
+
+from mkdocs_with_confluence.plugin import MkdocsWithConfluence
+
+
+def make_site(tmp_path):
+    for path in ("img/a.png", "guide/img/a.png", "guide/b.png", "index.html"):
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_bytes(b"x")
+    return str(tmp_path)
+
+
+def test_attachments_are_found_by_name_and_path(tmp_path):
+    site_dir = make_site(tmp_path)
+    plugin = MkdocsWithConfluence()
+    assert sorted(plugin.find_site_files(site_dir, "a.png")) == [tmp_path / "guide/img/a.png", tmp_path / "img/a.png"]
+    assert plugin.find_site_files(site_dir, "guide/img/a.png") == [tmp_path / "guide/img/a.png"]
+    # A path matches every file it is a suffix of
+    assert len(plugin.find_site_files(site_dir, "/img/a.png")) == 2
+    assert plugin.find_site_files(site_dir, "guide\\b.png") == [tmp_path / "guide/b.png"]
+    assert plugin.find_site_files(site_dir, "other/a.png") == []
+    assert plugin.find_site_files(site_dir, "missing.png") == []
+
+
+def test_absolute_paths_are_used_as_they_are(tmp_path):
+    site_dir = make_site(tmp_path / "site")
+    outside = tmp_path / "outside.png"
+    outside.write_bytes(b"x")
+    plugin = MkdocsWithConfluence()
+    assert plugin.find_site_files(site_dir, str(outside)) == [outside]
+
+
+def test_site_is_walked_once(tmp_path, monkeypatch):
+    site_dir = make_site(tmp_path)
+    walks = []
+    walk = os.walk
+
+    def counting_walk(top):
+        walks.append(top)
+        return walk(top)
+
+    monkeypatch.setattr(os, "walk", counting_walk)
+    plugin = MkdocsWithConfluence()
+    for attachment in ("a.png", "guide/b.png", "missing.png"):
+        plugin.find_site_files(site_dir, attachment)
+    assert walks == [site_dir]
@@ -0,0 +1,69 @@
+import pytest
+
+from mkdocs_with_confluence.state import SyncState
+
+
+def index_entry(version, page_id="100", message="MKDocsWithConfluence [v1]"):
+    return {
+        "title": "Intro",
+        "id": page_id,
+        "version": version,
+        "message": message,
+        "parent": "Root",
+        "parent_id": "1",
+    }
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = SyncState(str(tmp_path / "state.db"))
+    state.save_index_entry(index_entry(1))
+    state.save_source("Intro", "intro.md", "key-1", {"diagram.png": "abc"})
+    yield state
+    state.close()
+
+
+def test_unchanged_remote_keeps_the_published_source(state):
+    state.save_index_entry(index_entry(1))
+    page = state.get_page("Intro")
+    assert page["source_key"] == "key-1"
+    assert page["attachments"] == {"diagram.png": "abc"}
+
+
+def test_our_own_write_keeps_the_published_source(state):
+    state.save_index_entry(index_entry(2), ours=True)
+    page = state.get_page("Intro")
+    assert page["version"] == 2
+    assert page["source_key"] == "key-1"
+
+
+def test_remote_edit_drops_the_published_source(state):
+    state.save_index_entry(index_entry(2))
+    page = state.get_page("Intro")
+    assert page["version"] == 2
+    assert page["src_path"] == "intro.md"
+    assert page["source_key"] is None
+    assert page["attachments"] == {}
+
+
+def test_recreated_page_drops_the_published_source(state):
+    state.save_index_entry(index_entry(1, page_id="200"), ours=True)
+    assert state.get_page("Intro")["source_key"] is None
+
+
+def test_replace_index_removes_deleted_pages(state):
+    other = dict(index_entry(1, page_id="300"), title="Usage")
+    state.replace_index({"Usage": other})
+    assert state.get_page("Intro") is None
+    assert [page["title"] for page in state.pages()] == ["Usage"]
+
+
+def test_meta_survives_reopening(tmp_path):
+    path = str(tmp_path / "state.db")
+    state = SyncState(path)
+    state.set_meta("builds_since_verify", 3)
+    state.close()
+    state = SyncState(path)
+    assert state.get_meta("builds_since_verify") == "3"
+    assert state.get_meta("missing", "default") == "default"
+    state.close()
@@ -0,0 +1,46 @@
+import pytest
+from mkdocs.exceptions import Abort
+
+from conftest import MockConfluence, titles
+
+
+@pytest.fixture
+def second():
+    with MockConfluence(etags=False) as second:
+        second.add_page("Root B")
+        yield second
+
+
+def target_site(site, mock, second, **options):
+    targets = [
+        {"name": "first", "parent_page_name": "Root A"},
+        {"name": "second", "host_url": second.url, "space": "B", "parent_page_name": "Root B"},
+    ]
+    mock.add_page("Root A")
+    return site(metrics=True, targets=targets, **options)
+
+
+def test_pages_are_rendered_once_and_published_below_the_root_of_each_target(mock, second, site, publish):
+    plugin = publish(target_site(site, mock, second))
+    assert plugin.metrics.timings["render"].count == 8
+    first_titles, second_titles = titles(mock), titles(second)
+    assert first_titles.pop("Root") is None
+    for target_titles, root in ((first_titles, "Root A"), (second_titles, "Root B")):
+        assert len(target_titles) == 1 + 3 + 8
+        assert target_titles["Home"] == root
+        assert target_titles["Section 1"] == root
+        assert target_titles["Section 3"] == "Section 2"
+        assert target_titles["Page 00003"] == "Section 3"
+    # The index of each target is built from its own space
+    assert mock.requests["GET /rest/api/content?spaceKey"] == 1
+    assert second.requests["GET /rest/api/content?spaceKey"] == 1
+
+
+def test_failure_on_one_target_does_not_hold_up_the_other(mock, second, site, publish, caplog):
+    second.failures[("POST", "Page 00001")] = 500
+    with pytest.raises(Abort):
+        publish(target_site(site, mock, second))
+    assert "1 pages could not be published: Page 00001" in caplog.text
+    assert "Page 00001" in titles(mock)
+    assert "Page 00001" not in titles(second)
+    assert len(titles(second)) == 1 + 3 + 7
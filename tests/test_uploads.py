@@ -0,0 +1,52 @@
+from mkdocs_with_confluence.uploads import MultipartStream
+
+
+def make_stream(tmp_path):
+    image = tmp_path / "diagram.png"
+    image.write_bytes(bytes(range(256)) * 40)
+    stream = MultipartStream()
+    stream.add_field("comment", "MKDocsWithConfluence [v0]")
+    stream.add_file("file", str(image))
+    return stream, image
+
+
+def test_length_matches_the_body(tmp_path):
+    stream, image = make_stream(tmp_path)
+    body = stream.read()
+    assert len(body) == len(stream)
+    assert image.read_bytes() in body
+    assert body.endswith(f"--{stream.boundary}--\r\n".encode())
+    assert 'filename="diagram.png"' in body.decode("latin-1")
+    assert "Content-Type: image/png" in body.decode("latin-1")
+
+
+def test_small_reads_give_the_same_body(tmp_path):
+    stream, image = make_stream(tmp_path)
+    body = stream.read()
+    stream.seek(0)
+    assert b"".join(iter(lambda: stream.read(7), b"")) == body
+    assert stream.tell() == len(body)
+
+
+def test_rewind_after_a_partial_read(tmp_path):
+    stream, image = make_stream(tmp_path)
+    body = stream.read()
+    stream.seek(0)
+    stream.read(len(body) // 2)
+    assert stream.handle is not None
+    stream.seek(0)
+    assert stream.handle is None
+    assert stream.tell() == 0
+    assert stream.read() == body
+
+
+def test_file_handles_are_closed(tmp_path):
+    stream, image = make_stream(tmp_path)
+    stream.read()
+    assert stream.handle is None
+    stream.seek(0)
+    with stream:
+        stream.read(len(stream) // 2)
+        handle = stream.handle
+    assert handle.closed
+    assert stream.handle is None